@@ -269,6 +269,102 @@ def reconstituteGrid(bitRep):
   width, height = bitRep[:2]
   return Grid(width, height, bitRepresentation= bitRep[2:])
 
+class FoodBits:
+  """
+  An immutable set of food positions, read like a Grid of booleans (food[x][y],
+  count(), asList()) but held as an int bitmask: bit i stands for cells[i], one
+  of the open cells of the layout, and index maps a cell back to its bit.  Both
+  are shared by all the FoodBits of a layout.
+
+  Eating a dot makes a new FoodBits with one bit cleared, and hashing and
+  comparing are O(1), which makes them cheap parts of search states.
+  """
+  __slots__ = ('bits', 'width', 'height', 'cells', 'index')
+
+  def __init__(self, bits, width, height, cells, index):
+    self.bits = bits
+    self.width = width
+    self.height = height
+    self.cells = cells
+    self.index = index
+
+  def fromGrid(food, walls=None):
+    "The FoodBits of a food Grid, with a bit for each cell that is not a wall"
+    if walls is None:
+      cells = [(x, y) for x in range(food.width) for y in range(food.height)]
+    else:
+      cells = walls.asList(False)
+    index = dict((cell, i) for i, cell in enumerate(cells))
+    bits = 0
+    for cell in food.asList():
+      bits |= 1 << index[cell]
+    return FoodBits(bits, food.width, food.height, tuple(cells), index)
+  fromGrid = staticmethod(fromGrid)
+
+  def hasFood(self, x, y):
+    i = self.index.get((x, y))
+    return i is not None and (self.bits >> i) & 1 == 1
+
+  def eat(self, x, y):
+    "Returns the food left once the dot at (x,y), if any, is eaten"
+    i = self.index.get((x, y))
+    if i is None or not (self.bits >> i) & 1:
+      return self
+    return FoodBits(self.bits & ~(1 << i), self.width, self.height, self.cells, self.index)
+
+  def __getitem__(self, x):
+    return _FoodColumn(self, x)
+
+  def __eq__(self, other):
+    if not isinstance(other, FoodBits): return False
+    return self.bits == other.bits and self.cells is other.cells
+
+  def __hash__(self):
+    return hash(self.bits)
+
+  def __str__(self):
+    return str(self.asGrid())
+
+  def count(self, item=True):
+    food = self.bits.bit_count()
+    return food if item else self.width * self.height - food
+
+  def asList(self, key=True):
+    if not key:
+      return self.asGrid().asList(False)
+    bits, food = self.bits, []
+    while bits:
+      low = bits & -bits
+      food.append(self.cells[low.bit_length() - 1])
+      bits ^= low
+    return food
+
+  def asGrid(self):
+    grid = Grid(self.width, self.height)
+    for x, y in self.asList():
+      grid[x][y] = True
+    return grid
+
+  def copy(self):
+    return self
+
+  def deepCopy(self):
+    return self
+
+  def shallowCopy(self):
+    return self
+
+class _FoodColumn:
+  "Column x of a FoodBits, so that food[x][y] reads like a Grid"
+  __slots__ = ('food', 'x')
+
+  def __init__(self, food, x):
+    self.food = food
+    self.x = x
+
+  def __getitem__(self, y):
+    return self.food.hasFood(self.x, y)
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
@@ -0,0 +1,155 @@
+# mazeDistances.py
+# ----------------
+# Exact maze distances between every pair of open cells of a layout.
+
+"""
+The maze distances of a layout only depend on its walls, so they are worked
+out once per layout: a breadth first search from every open cell (all of
+them in step, on numpy arrays), stored as a uint16 matrix. The matrices are
+cached by a digest of the walls, in memory and on disk, so every search
+agent and heuristic of the same layout shares them:
+
+> distances = getMazeDistances(gameState.getWalls())
+> distances.distance((1, 1), (5, 3))
+"""
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from PCF.game import Directions
+from PCF.game import Actions
+
+# Distance between cells that cannot reach each other
+UNREACHABLE = np.iinfo(np.uint16).max
+# Where the distance matrices are kept between runs
+MAZE_DISTANCES_DIR = os.path.join(tempfile.gettempdir(), 'pacman-maze-distances')
+
+MAZE_DISTANCES_CACHE = {}
+
+class MazeDistances:
+  """
+  The maze distances between all the open cells of a walls Grid (game.py).
+
+  cells lists the open cells, and index[x][y] is the row and column of cell
+  (x,y) in distances (-1 for walls).
+  """
+
+  def __init__(self, walls, distances=None):
+    self.width, self.height = walls.width, walls.height
+    self.cells = walls.asList(False)
+    self.index = np.full((self.width, self.height), -1, np.int32)
+    for i, (x, y) in enumerate(self.cells):
+      self.index[x, y] = i
+    if distances is None:
+      distances = self.computeDistances()
+    self.distances = distances
+
+  def computeDistances(self):
+    """
+    Breadth first searches from every cell at once: row s of reached holds
+    the cells reached from cell s so far.
+    """
+    n = len(self.cells)
+    # neighbors[c] are the open cells next to c; n stands for a wall
+    neighbors = np.full((n, 4), n, np.int32)
+    for i, (x, y) in enumerate(self.cells):
+      for k, (dx, dy) in enumerate([(0, 1), (0, -1), (1, 0), (-1, 0)]):
+        if 0 <= x + dx < self.width and 0 <= y + dy < self.height and self.index[x + dx, y + dy] >= 0:
+          neighbors[i, k] = self.index[x + dx, y + dy]
+
+    distances = np.full((n, n), UNREACHABLE, np.uint16)
+    np.fill_diagonal(distances, 0)
+    # An extra column for the walls, never reached
+    reached = np.zeros((n, n + 1), np.bool_)
+    reached[np.arange(n), np.arange(n)] = True
+    frontier = reached.copy()
+    distance = 0
+    while frontier.any():
+      distance += 1
+      found = np.zeros_like(frontier)
+      for k in range(4):
+        found[:, :n] |= frontier[:, neighbors[:, k]]
+      found &= ~reached
+      distances[found[:, :n]] = distance
+      reached |= found
+      frontier = found
+    return distances
+
+  def distance(self, point1, point2):
+    "The maze distance between two open cells (UNREACHABLE if there is no path)"
+    return int(self.distances[self.index[point1], self.index[point2]])
+
+  def distancesFrom(self, position, points):
+    "The maze distances from position to each of points, as an array"
+    return self.distances[self.index[position], self.index[tuple(np.transpose(points))]]
+
+  def nearest(self, position, points):
+    "Returns (distance, point) of the point nearest to position in the maze"
+    distances = self.distancesFrom(position, points)
+    i = int(distances.argmin())
+    return int(distances[i]), points[i]
+
+  def farthest(self, position, points):
+    "Returns (distance, point) of the point farthest from position in the maze"
+    distances = self.distancesFrom(position, points)
+    i = int(distances.argmax())
+    return int(distances[i]), points[i]
+
+  def pathTo(self, position, goal):
+    """
+    Returns a shortest list of actions from position to goal: each step goes to
+    a neighbor one step closer to goal.
+    """
+    actions = []
+    remaining = self.distance(position, goal)
+    if remaining == UNREACHABLE:
+      return None
+    x, y = position
+    while remaining > 0:
+      for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+        dx, dy = Actions.directionToVector(action)
+        nextx, nexty = int(x + dx), int(y + dy)
+        if self.index[nextx, nexty] >= 0 and self.distance((nextx, nexty), goal) == remaining - 1:
+          break
+      actions.append(action)
+      x, y = nextx, nexty
+      remaining -= 1
+    return actions
+
+def wallsDigest(walls):
+  "A digest of the walls Grid: equal for layouts with the same walls"
+  return hashlib.sha1(('%d %d\n' % (walls.width, walls.height) + str(walls)).encode()).hexdigest()
+
+def getMazeDistances(walls, cacheDir=MAZE_DISTANCES_DIR):
+  """
+  Returns the MazeDistances of walls, from memory, from cacheDir or else worked
+  out (and stored in both). cacheDir None keeps them in memory only.
+  """
+  digest = wallsDigest(walls)
+  if digest in MAZE_DISTANCES_CACHE:
+    return MAZE_DISTANCES_CACHE[digest]
+
+  distances = None
+  path = os.path.join(cacheDir, digest + '.npy') if cacheDir is not None else None
+  if path is not None and os.path.exists(path):
+    try:
+      distances = np.load(path)
+    except (OSError, ValueError):
+      distances = None
+  mazeDistances = MazeDistances(walls, distances)
+  if mazeDistances.distances.shape != (len(mazeDistances.cells),) * 2:
+    # A stale or damaged file
+    mazeDistances = MazeDistances(walls)
+    distances = None
+  if path is not None and distances is None:
+    os.makedirs(cacheDir, exist_ok=True)
+    # Written under a temporary name, so readers never see half a file
+    handle, tempPath = tempfile.mkstemp(dir=cacheDir, suffix='.npy')
+    with os.fdopen(handle, 'wb') as tempFile:
+      np.save(tempFile, mazeDistances.distances)
+    os.replace(tempPath, path)
+  MAZE_DISTANCES_CACHE[digest] = mazeDistances
+  return mazeDistances
@@ -44,6 +44,7 @@ import PCF.layout as layout
 from util import nearestPoint
 from util import manhattanDistance
 import util
+import registry
 import sys, types, time, random, os
 
 
@@ -547,7 +548,7 @@ def readCommand(argv):
 
     # Choose a Pacman agent
     noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics)
-    pacmanType = searchAgents.SearchAgent
+    pacmanType = loadAgent(options.pacman, noKeyboard)
     agentOpts = parseAgentArgs(options.agentArgs)
     if options.numTraining > 0:
         args['numTraining'] = options.numTraining
@@ -561,7 +562,7 @@ def readCommand(argv):
         options.numIgnore = int(agentOpts['numTrain'])
 
     # Choose a ghost agent
-    ghostType = ghostAgents.Agent
+    ghostType = loadAgent(options.ghost, noKeyboard)
     args['ghosts'] = [ghostType(i + 1) for i in range(options.numGhosts)]
 
     # Choose a display format
@@ -595,32 +596,11 @@ def readCommand(argv):
 
     return args
 
-"""
-
 def loadAgent(pacman, nographics):
-    # Looks through all pythonPath Directories for the right module,
-    pythonPathStr = os.path.dirname(os.path.realpath(__file__))
-    if pythonPathStr.find(';') == -1:
-        pythonPathDirs = pythonPathStr.split(':')
-    else:
-        pythonPathDirs = pythonPathStr.split(';')
-    pythonPathDirs.append('.')
-
-    for moduleDir in pythonPathDirs:
-        if not os.path.isdir(moduleDir): continue
-        moduleNames = [f for f in os.listdir(moduleDir) if f.endswith('gents.py')]
-        for modulename in moduleNames:
-            try:
-                module = __import__(modulename[:-3])
-            except ImportError:
-                raise 
-                continue
-            if pacman in dir(module):
-                if nographics and modulename == 'keyboardAgents.py':
-                    raise Exception('Using the keyboard requires graphics (not text display)')
-                return getattr(module, pacman)
-    raise Exception('The agent ' + pacman + ' is not specified in any *Agents.py.')
-"""
+    # Imports only the module the registry names for the agent
+    if nographics and pacman == 'KeyboardAgent':
+        raise Exception('Using the keyboard requires graphics (not text display)')
+    return registry.resolve(pacman, registry.AGENTS)
 
 def replayGame(layout, actions, display):
     import PCF.pacmanAgents as pacmanAgents
@@ -31,6 +31,8 @@ Good luck and happy searching!
 from PCF.game import Directions
 from PCF.game import Agent
 from PCF.game import Actions
+from PCF.game import FoodBits
+from PCF.mazeDistances import getMazeDistances
 import util
 import time
 import search
@@ -352,29 +354,31 @@ class AStarCornersAgent(SearchAgent):
     self.searchFunction = lambda prob: search.aStarSearch(prob, cornersHeuristic)
     self.searchType = CornersProblem
 
-class FoodSearchProblem:
+class FoodSearchProblem(search.SearchProblem):
   """
   A search problem associated with finding the a path that collects all of the 
   food (dots) in a Pacman game.
   
   A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
     pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-    foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food 
+    foodGrid:       a FoodBits (see game.py), read like a Grid of either True or False,
+                    specifying remaining food 
   """
   def __init__(self, startingGameState):
-    self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
     self.walls = startingGameState.getWalls()
+    food = FoodBits.fromGrid(startingGameState.getFood(), self.walls)
+    self.start = (startingGameState.getPacmanPosition(), food)
     self.startingGameState = startingGameState
     self._expanded = 0
     self.heuristicInfo = {} # A dictionary for the heuristic to store information
       
-  def getStartState(self):
+  def get_start_state(self):
     return self.start
   
-  def isGoalState(self, state):
+  def is_goal_state(self, state):
     return state[1].count() == 0
 
-  def getSuccessors(self, state):
+  def get_successors(self, state):
     "Returns successor states, the actions they require, and a cost of 1."
     successors = []
     self._expanded += 1
@@ -383,15 +387,14 @@ class FoodSearchProblem:
       dx, dy = Actions.directionToVector(direction)
       nextx, nexty = int(x + dx), int(y + dy)
       if not self.walls[nextx][nexty]:
-        nextFood = state[1].copy()
-        nextFood[nextx][nexty] = False
+        nextFood = state[1].eat(nextx, nexty)
         successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
     return successors
 
-  def getCostOfActions(self, actions):
+  def get_cost_of_actions(self, actions):
     """Returns the cost of a particular sequence of actions.  If those actions
     include an illegal move, return 999999"""
-    x,y= self.getStartState()[0]
+    x,y= self.get_start_state()[0]
     cost = 0
     for action in actions:
       # figure out the next state and see whether it's legal
@@ -405,7 +408,7 @@ class FoodSearchProblem:
 class AStarFoodSearchAgent(SearchAgent):
   "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
   def __init__(self):
-    self.searchFunction = lambda prob: search.aStarSearch(prob, foodHeuristic)
+    self.searchFunction = lambda prob: search.astar(prob, foodHeuristic)
     self.searchType = FoodSearchProblem
 
 def foodHeuristic(state, problem):
@@ -421,8 +424,8 @@ def foodHeuristic(state, problem):
   inadmissible or inconsistent heuristics may find optimal solutions, so be careful.
   
   The state is a tuple ( pacmanPosition, foodGrid ) where foodGrid is a 
-  Grid (see game.py) of either True or False. You can call foodGrid.asList()
-  to get a list of food coordinates instead.
+  FoodBits (see game.py), read like a Grid of either True or False. You can call
+  foodGrid.asList() to get a list of food coordinates instead.
   
   If you want access to info like walls, capsules, etc., you can query the problem.
   For example, problem.walls gives you a Grid of where the walls are.
@@ -434,8 +437,13 @@ def foodHeuristic(state, problem):
   Subsequent calls to this heuristic can access problem.heuristicInfo['wallCount']
   """
   position, foodGrid = state
-  "*** YOUR CODE HERE ***"
-  return 0
+  # The food farthest away in the maze has to be walked to
+  foodList = foodGrid.asList()
+  if not foodList:
+    return 0
+  if 'mazeDistances' not in problem.heuristicInfo:
+    problem.heuristicInfo['mazeDistances'] = getMazeDistances(problem.walls)
+  return problem.heuristicInfo['mazeDistances'].farthest(position, foodList)[0]
   
 class ClosestDotSearchAgent(SearchAgent):
   "Search for all food using a sequence of searches"
@@ -460,10 +468,11 @@ class ClosestDotSearchAgent(SearchAgent):
     startPosition = gameState.getPacmanPosition()
     food = gameState.getFood()
     walls = gameState.getWalls()
-    problem = AnyFoodSearchProblem(gameState)
 
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    # No search: the maze distances tell the closest dot and the way to it
+    distances = getMazeDistances(walls)
+    distance, closest = distances.nearest(startPosition, food.asList())
+    return distances.pathTo(startPosition, closest)
   
 class AnyFoodSearchProblem(PositionSearchProblem):
   """
@@ -491,15 +500,14 @@ class AnyFoodSearchProblem(PositionSearchProblem):
     self.costFn = lambda x: 1
     self._visited, self._visitedlist, self._expanded = {}, [], 0
     
-  def isGoalState(self, state):
+  def is_goal_state(self, state):
     """
     The state is Pacman's position. Fill this in with a goal test
     that will complete the problem definition.
     """
     x,y = state
     
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    return self.food[x][y]
 
 ##################
 # Mini-contest 1 #
@@ -523,9 +531,9 @@ class ApproximateSearchAgent(Agent):
     
 def mazeDistance(point1, point2, gameState):
   """
-  Returns the maze distance between any two points, using the search functions
-  you have already built.  The gameState can be any game state -- Pacman's position
-  in that state is ignored.
+  Returns the maze distance between any two points, from the maze distances of
+  the layout (worked out once per layout).  The gameState can be any game state --
+  Pacman's position in that state is ignored.
   
   Example usage: mazeDistance( (2,4), (5,6), gameState)
   
@@ -536,5 +544,4 @@ def mazeDistance(point1, point2, gameState):
   walls = gameState.getWalls()
   assert not walls[x1][y1], 'point1 is a wall: ' + point1
   assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-  prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False)
-  return len(search.bfs(prob))
\ No newline at end of file
+  return getMazeDistances(walls).distance(point1, point2)
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Batches of seeded 4-player games, played without a display in a pool of
+worker processes.
+
+Every game is played with its own seed, so a game can be replayed alone with
+the same seed. Results are written as one JSON line per game as soon as the
+game finishes, and aggregated into score distributions, game lengths and
+move-generation latencies.
+"""
+
+import functools
+import json
+import multiprocessing
+import random
+import statistics
+import time
+import traceback
+from collections import Counter
+
+from bitboard import BitBoard
+from displays import NoDisplay
+from game import GameEngine
+from inputs import Input, RandomInput
+from pieces import PieceList
+
+# The inputs a batch can be played with, by name
+INPUTS = {
+    'random': RandomInput,
+}
+
+
+class TimedInput(Input):
+    """
+    Wraps an input and records how long each of its get_move calls takes.
+    """
+
+    def __init__(self, input):
+        self.input = input
+        self.latencies = []
+
+    def get_move(self, player, board):
+        start_time = time.perf_counter()
+        move = self.input.get_move(player, board)
+        self.latencies.append(time.perf_counter() - start_time)
+        return move
+
+
+@functools.lru_cache(maxsize=None)
+def load_pieces(pieces_file):
+    return PieceList(pieces_file)
+
+
+def play_seeded_game(seed, inputs=('random',) * 4, board_w=20, board_h=20,
+                     pieces_file='valid_pieces.txt', board='array', track_moves=False):
+    """
+    Plays one game without a display, with random seeded by seed, and returns
+    its result: the scores, the number of rounds and moves, the latency of
+    every get_move call by player, and the wall time. A game that raises
+    returns the error (and traceback) instead.
+    """
+    random.seed(seed)
+    result = {'seed': seed}
+    start_time = time.time()
+    try:
+        players = [TimedInput(INPUTS[name]()) for name in inputs]
+        engine = GameEngine(players, board_w, board_h, load_pieces(pieces_file), NoDisplay())
+        if board == 'bitboard':
+            engine.board = BitBoard.from_board(engine.board)
+        elif track_moves:
+            engine.board.track_legal_moves()
+        result['scores'] = [int(score) for score in engine.play_game(verbose=False)]
+        result['rounds'] = engine.turn_num
+        result['moves'] = int(engine.board.pieces.size - engine.board.pieces.sum())
+        result['latencies'] = [player.latencies for player in players]
+    except Exception as error:
+        result['error'] = '%s: %s' % (type(error).__name__, error)
+        result['traceback'] = traceback.format_exc()
+    result['wall_time'] = time.time() - start_time
+    return result
+
+
+def summarize(results):
+    """
+    Aggregates game results: the score distribution of each player (and of
+    the winning score), game lengths and move-generation latencies.
+    """
+    games = [result for result in results if 'error' not in result]
+    summary = {'games': len(results), 'errors': len(results) - len(games)}
+    if not games:
+        return summary
+
+    def describe(values):
+        values = sorted(values)
+        return {
+            'mean': statistics.mean(values),
+            'stdev': statistics.pstdev(values),
+            'min': values[0],
+            'median': values[len(values) // 2],
+            'p95': values[min(len(values) * 95 // 100, len(values) - 1)],
+            'max': values[-1],
+        }
+
+    num_players = len(games[0]['scores'])
+    summary['scores'] = [describe([game['scores'][p] for game in games]) for p in range(num_players)]
+    summary['score_histograms'] = [sorted(Counter(game['scores'][p] for game in games).items())
+                                   for p in range(num_players)]
+    summary['wins'] = [sum(1 for game in games if game['scores'][p] == max(game['scores']))
+                       for p in range(num_players)]
+    summary['winning_score'] = describe([max(game['scores']) for game in games])
+    summary['rounds'] = describe([game['rounds'] for game in games])
+    summary['moves'] = describe([game['moves'] for game in games])
+    summary['latency'] = describe([latency for game in games
+                                   for latencies in game['latencies'] for latency in latencies])
+    summary['wall_time'] = describe([game['wall_time'] for game in games])
+    return summary
+
+
+def run_batch(num_games, seed=0, num_workers=None, output=None, **game_options):
+    """
+    Plays num_games games with the seeds seed, seed + 1, ... in num_workers
+    processes (one per CPU by default), writing each result to the file
+    output as a JSON line as soon as its game finishes. Returns the summary
+    of all the games (see summarize).
+    """
+    play = functools.partial(play_seeded_game, **game_options)
+    results = []
+    output_file = open(output, 'w') if output is not None else None
+    try:
+        with multiprocessing.Pool(num_workers) as pool:
+            for result in pool.imap_unordered(play, range(seed, seed + num_games)):
+                if output_file is not None:
+                    output_file.write(json.dumps(result) + '\n')
+                    output_file.flush()
+                results.append(result)
+    finally:
+        if output_file is not None:
+            output_file.close()
+    return summarize(results)
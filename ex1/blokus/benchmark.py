@@ -0,0 +1,241 @@
+"""
+Headless benchmarks of the blokus searches.
+
+Solves a fixed catalog of puzzles without a display, each in a fresh process,
+and records for every run the wall time, the expanded and generated nodes,
+the peak RSS, the cost and length of the plan and whether it reaches the
+goal. The results are written as JSON, and can be compared against a stored
+baseline to catch regressions in search.py, board.py or the heuristics:
+
+    python benchmark.py -o baseline.json
+    python benchmark.py -b baseline.json
+"""
+
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+
+import blokus_problems
+import search
+from bitboard import BitBoard
+from pieces import PieceList
+from solution_cache import plan_reaches_goal
+
+# Each instance is a puzzle as game.py builds it: puzzle, board_w, board_h,
+# pieces, start, targets (cover and sub-optimal), search and heuristic
+# (ignored by sub-optimal, which runs for time_limit seconds instead), and
+# optionally board ('array' or 'bitboard') and track_moves.
+CATALOG = [
+    {'name': 'fill-4x7-dfs', 'puzzle': 'fill', 'board_w': 4, 'board_h': 7,
+     'pieces': 'tiny_set.txt', 'start': (0, 0), 'search': 'dfs'},
+    {'name': 'fill-4x7-bfs', 'puzzle': 'fill', 'board_w': 4, 'board_h': 7,
+     'pieces': 'tiny_set.txt', 'start': (0, 0), 'search': 'bfs'},
+    {'name': 'fill-4x7-ucs', 'puzzle': 'fill', 'board_w': 4, 'board_h': 7,
+     'pieces': 'tiny_set.txt', 'start': (0, 0), 'search': 'ucs'},
+    {'name': 'fill-4x7-bfs-bitboard', 'puzzle': 'fill', 'board_w': 4, 'board_h': 7,
+     'pieces': 'tiny_set.txt', 'start': (0, 0), 'search': 'bfs', 'board': 'bitboard'},
+    {'name': 'fill-4x7-bfs-tracked', 'puzzle': 'fill', 'board_w': 4, 'board_h': 7,
+     'pieces': 'tiny_set.txt', 'start': (0, 0), 'search': 'bfs', 'track_moves': True},
+    # Deep enough that updating the tracked moves beats listing them again
+    {'name': 'corners-8x8-dfs', 'puzzle': 'corners', 'board_w': 8, 'board_h': 8,
+     'pieces': 'valid_pieces.txt', 'start': (0, 0), 'search': 'dfs'},
+    {'name': 'corners-8x8-dfs-tracked', 'puzzle': 'corners', 'board_w': 8, 'board_h': 8,
+     'pieces': 'valid_pieces.txt', 'start': (0, 0), 'search': 'dfs', 'track_moves': True},
+    {'name': 'corners-6x6-astar', 'puzzle': 'corners', 'board_w': 6, 'board_h': 6,
+     'pieces': 'valid_pieces.txt', 'start': (0, 0), 'search': 'astar',
+     'heuristic': 'blokus_corners_heuristic'},
+    {'name': 'corners-6x6-idastar', 'puzzle': 'corners', 'board_w': 6, 'board_h': 6,
+     'pieces': 'valid_pieces.txt', 'start': (0, 0), 'search': 'idastar',
+     'heuristic': 'blokus_corners_heuristic'},
+    {'name': 'cover-6x6-astar', 'puzzle': 'cover', 'board_w': 6, 'board_h': 6,
+     'pieces': 'valid_pieces.txt', 'start': (0, 0), 'targets': [(3, 3), (5, 5)], 'search': 'astar',
+     'heuristic': 'blokus_cover_heuristic'},
+    {'name': 'sub-optimal-10x10', 'puzzle': 'sub-optimal', 'board_w': 10, 'board_h': 10,
+     'pieces': 'valid_pieces.txt', 'start': (0, 0), 'targets': [(5, 5), (9, 2), (2, 8)],
+     'time_limit': 5.0},
+    {'name': 'sub-optimal-14x14', 'puzzle': 'sub-optimal', 'board_w': 14, 'board_h': 14,
+     'pieces': 'valid_pieces.txt', 'start': (0, 0), 'targets': [(1, 1), (5, 9), (9, 6)],
+     'time_limit': 5.0},
+]
+
+# A metric regresses when it grows by more than both its relative tolerance
+# and its absolute slack over the baseline
+TOLERANCES = {
+    'wall_time': (0.25, 0.05),
+    'peak_rss_kb': (0.25, 1024),
+    'expanded': (0, 0),
+    'generated': (0, 0),
+    'cost': (0, 0),
+}
+# Node counts of time-limited searches depend on the speed of the machine
+TIME_LIMITED_METRICS = ('expanded', 'generated')
+
+
+def make_problem(instance):
+    """
+    Builds the search problem (or sub-optimal solver) of a catalog instance.
+    """
+    piece_list = PieceList(instance['pieces'])
+    args = (instance['board_w'], instance['board_h'], piece_list, tuple(instance['start']))
+    targets = [tuple(target) for target in instance.get('targets', [])]
+    puzzle = instance['puzzle']
+    if puzzle == 'fill':
+        problem = blokus_problems.BlokusFillProblem(*args)
+    elif puzzle == 'corners':
+        problem = blokus_problems.BlokusCornersProblem(*args)
+    elif puzzle == 'cover':
+        problem = blokus_problems.BlokusCoverProblem(*args, targets)
+    elif puzzle == 'sub-optimal':
+        problem = blokus_problems.ClosestLocationSearch(*args, targets, instance['time_limit'])
+    else:
+        raise Exception('unrecognized puzzle: ' + puzzle)
+    if instance.get('board', 'array') == 'bitboard':
+        problem.board = BitBoard.from_board(problem.board)
+    elif instance.get('track_moves'):
+        problem.board.track_legal_moves()
+    return problem
+
+
+def run_instance(instance):
+    """
+    Solves one catalog instance and returns its metrics. Meant to run in a
+    fresh process, so peak_rss_kb is the peak of this instance alone.
+    """
+    problem = make_problem(instance)
+    start_time = time.time()
+    if instance['puzzle'] == 'sub-optimal':
+        plan = problem.solve()
+    elif instance.get('heuristic'):
+        heuristic = getattr(blokus_problems, instance['heuristic'])
+        plan = getattr(search, instance['search'])(problem, heuristic)
+    else:
+        plan = getattr(search, instance['search'])(problem)
+    wall_time = time.time() - start_time
+    return {
+        'wall_time': wall_time,
+        'expanded': problem.expanded,
+        'generated': problem.generated,
+        # kilobytes on Linux
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'cost': sum(move.piece.get_num_tiles() for move in plan) if instance['puzzle'] != 'fill'
+        else len(plan),
+        'plan_length': len(plan),
+        'solved': plan_reaches_goal(problem, plan),
+    }
+
+
+def run_catalog(catalog, repeat=1, timeout=300):
+    """
+    Runs every instance of the catalog repeat times, each run in a fresh
+    process, and returns the results: the metrics of the fastest run (or
+    'error' if the instance failed or took more than timeout seconds).
+    """
+    results = []
+    for instance in catalog:
+        result = {'name': instance['name'], 'instance': instance}
+        for _ in range(repeat):
+            with multiprocessing.Pool(1) as pool:
+                try:
+                    metrics = pool.apply_async(run_instance, (instance,)).get(timeout)
+                except multiprocessing.TimeoutError:
+                    result['error'] = 'timed out after %d seconds' % timeout
+                    break
+                except Exception as error:
+                    result['error'] = '%s: %s' % (type(error).__name__, error)
+                    break
+            if 'metrics' not in result or metrics['wall_time'] < result['metrics']['wall_time']:
+                result['metrics'] = metrics
+        results.append(result)
+        print(format_result(result), flush=True)
+    return results
+
+
+def format_result(result):
+    if 'error' in result:
+        return '%-24s %s' % (result['name'], result['error'])
+    metrics = result['metrics']
+    return '%-24s %8.3fs %8d expanded %9d generated %8d KB  cost %3d in %2d moves%s' % (
+        result['name'], metrics['wall_time'], metrics['expanded'], metrics['generated'],
+        metrics['peak_rss_kb'], metrics['cost'], metrics['plan_length'],
+        '' if metrics['solved'] else '  NOT SOLVED')
+
+
+def compare(results, baseline):
+    """
+    Returns a list of the regressions of results against the baseline
+    results: failed or unsolved instances the baseline solved, and metrics
+    that grew beyond TOLERANCES.
+    """
+    baseline = {result['name']: result for result in baseline}
+    regressions = []
+    for result in results:
+        name = result['name']
+        if name not in baseline or 'metrics' not in baseline[name]:
+            continue
+        old = baseline[name]['metrics']
+        if 'error' in result:
+            regressions.append('%s: %s' % (name, result['error']))
+            continue
+        new = result['metrics']
+        if old['solved'] and not new['solved']:
+            regressions.append('%s: the plan no longer reaches the goal' % name)
+        for metric, (relative, absolute) in TOLERANCES.items():
+            if 'time_limit' in result['instance'] and metric in TIME_LIMITED_METRICS:
+                continue
+            if new[metric] > old[metric] * (1 + relative) and new[metric] > old[metric] + absolute:
+                regressions.append('%s: %s went from %s to %s' % (name, metric, old[metric], new[metric]))
+    return regressions
+
+
+def main():
+    from optparse import OptionParser
+    usage_str = """
+    USAGE:      python benchmark.py <options>
+    EXAMPLES:   python benchmark.py -o baseline.json
+                  - runs the catalog and stores the results as a baseline
+                python benchmark.py -b baseline.json -r 3
+                  - runs the catalog 3 times and fails on regressions
+    """
+    parser = OptionParser(usage_str)
+    parser.add_option('-c', '--catalog', dest='catalog',
+                      help='a JSON list of instances to run instead of the built-in catalog', default=None)
+    parser.add_option('-n', '--name', dest='names', action='append',
+                      help='only run the instance with this name (may be repeated)', default=None)
+    parser.add_option('-o', '--output', dest='output',
+                      help='the file to write the JSON results to', default=None)
+    parser.add_option('-b', '--baseline', dest='baseline',
+                      help='the JSON results to compare against', default=None)
+    parser.add_option('-r', '--repeat', dest='repeat', type='int',
+                      help='the number of runs of each instance (the fastest counts)', default=1)
+    parser.add_option('-t', '--timeout', dest='timeout', type='int',
+                      help='the number of seconds an instance may take', default=300)
+    options, args = parser.parse_args()
+
+    catalog = CATALOG
+    if options.catalog is not None:
+        with open(options.catalog) as catalog_file:
+            catalog = json.load(catalog_file)
+    if options.names:
+        catalog = [instance for instance in catalog if instance['name'] in options.names]
+
+    results = run_catalog(catalog, options.repeat, options.timeout)
+    if options.output is not None:
+        with open(options.output, 'w') as output_file:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                       'results': results}, output_file, indent=2)
+
+    if options.baseline is not None:
+        with open(options.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file)['results'])
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            sys.exit(1)
+        print('no regressions against ' + options.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import random
+from functools import lru_cache
+
+import numpy as np
+
+from board import Move, SAMPLE_TRIES, anchor_placements
+
+"""
+A bit-packed alternative to board.Board.
+
+Every per-player layer of the board (occupied tiles, illegal tiles and
+diagonally attached corners) is stored as one python int. Cell (x, y) lives at
+bit y * stride + x, where stride = board_w + 1: the extra column is never on
+the board, so shifting a mask one step left/right can not wrap a tile into the
+neighbouring row.
+"""
+
+
+@lru_cache(maxsize=None)
+def orientation_mask(orientation, stride):
+    """
+    Pack the tiles of one piece orientation into a bitmask anchored at (0, 0).
+
+    Returns (mask, width, height) where width/height is the bounding box of
+    the orientation.
+    """
+    mask = 0
+    width = 0
+    height = 0
+    for (x, y) in orientation:
+        mask |= 1 << (y * stride + x)
+        width = max(width, x + 1)
+        height = max(height, y + 1)
+    return mask, width, height
+
+
+def iter_bits(mask):
+    """
+    Yield the indices of the set bits of <mask>, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class _LayerView(object):
+    """
+    Numpy-like [player, y, x] access to one of the per-player bit layers of a
+    BitBoard, so code written against Board.connected keeps working.
+    """
+
+    def __init__(self, board, layer):
+        self.board = board
+        self.layer = layer
+
+    def __getitem__(self, index):
+        player, y, x = index
+        return bool(self.layer[player] >> self.board.bit(x, y) & 1)
+
+    def __setitem__(self, index, value):
+        player, y, x = index
+        bit = 1 << self.board.bit(x, y)
+        if value:
+            self.layer[player] |= bit
+        else:
+            self.layer[player] &= ~bit
+
+
+class BitBoard(object):
+    """
+    A BitBoard has the same public interface as Board (add_move, do_move,
+    get_legal_moves, check_move_valid, get_position, score) but validates a
+    move with a shift and two ANDs instead of one python call per tile.
+
+    The BitBoard stores:
+    - board_w/board_h: the width and height of the playing area
+    - stride: the number of bits per board row (board_w + 1)
+    - occupied: occupied[player] has a bit set for every tile of that player
+    - blocked: blocked[player] has a bit set for every tile the player may not
+      use (any occupied tile, or a tile adjacent to one of its own tiles)
+    - corners: corners[player] has a bit set for every tile diagonally
+      connected to one of the player's tiles (or its starting corner)
+    - pieces: the same num_players x num_pieces availability array as Board
+    - piece_list: A PieceList object shared with the game engine
+    - undo: the stack of the layers saved by push_move, restored by pop_move
+    """
+
+    def __init__(self, board_w, board_h, num_players, piece_list, starting_point=(0, 0)):
+        self.board_w = board_w
+        self.board_h = board_h
+        self.num_players = num_players
+        self.scores = [0] * self.num_players
+        self.stride = board_w + 1
+
+        row = (1 << board_w) - 1
+        self.full = 0
+        for y in range(board_h):
+            self.full |= row << (y * self.stride)
+
+        self.occupied = [0] * num_players
+        self.blocked = [0] * num_players
+        self.corners = [0] * num_players
+        # starting_point is given as (row, column), like in Board
+        self.corners[0] = 1 << self.bit(starting_point[1], starting_point[0])
+
+        self.piece_list = piece_list
+        self.pieces = np.full((num_players, piece_list.get_num_pieces()), True, np.bool_)
+        self.undo = []
+        # anchor_placements() with each orientation's mask
+        self.placements = [[placement + orientation_mask(placement[1], self.stride)[:1]
+                            for placement in placements]
+                           for placements in anchor_placements(piece_list)]
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Build a BitBoard holding exactly the same position as <board>.
+        """
+        bit_board = cls(board.board_w, board.board_h, board.num_players, board.piece_list)
+        bit_board.corners[0] = 0
+        for y in range(board.board_h):
+            for x in range(board.board_w):
+                bit = 1 << bit_board.bit(x, y)
+                owner = board.state[y, x]
+                if owner != -1:
+                    bit_board.occupied[owner] |= bit
+                for p in range(board.num_players):
+                    if not board._legal[p, y, x]:
+                        bit_board.blocked[p] |= bit
+                    if board.connected[p, y, x]:
+                        bit_board.corners[p] |= bit
+        bit_board.pieces = np.copy(board.pieces)
+        bit_board.scores = board.scores[:]
+        return bit_board
+
+    def bit(self, x, y):
+        """
+        Return the index of the bit representing tile (<x>, <y>).
+        """
+        return y * self.stride + x
+
+    @property
+    def connected(self):
+        return _LayerView(self, self.corners)
+
+    @property
+    def state(self):
+        """
+        The board as a 2D array: -1 = free; 0-3 = player x's tile.
+        """
+        state = np.full((self.board_h, self.board_w), -1, np.int8)
+        for player, mask in enumerate(self.occupied):
+            for bit in iter_bits(mask):
+                state[bit // self.stride, bit % self.stride] = player
+        return state
+
+    def placement_mask(self, move):
+        """
+        Return the bitmask of the tiles covered by <move>, or None if the move
+        is not completely in bounds.
+        """
+        mask, width, height = orientation_mask(move.orientation, self.stride)
+        if move.x < 0 or move.y < 0 or move.x + width > self.board_w or move.y + height > self.board_h:
+            return None
+        return mask << self.bit(move.x, move.y)
+
+    def add_move(self, player, move):
+        """
+        Try to add <player>'s <move>.
+
+        If the move is legal, the board state is updated; if it's not legal, a
+        ValueError is raised.
+
+        Returns the number of tiles placed on the board.
+        """
+        if not self.check_move_valid(player, move):
+            raise ValueError("Move is not allowed")
+
+        self.pieces[player, move.piece_index] = False  # mark piece as used
+        mask = self.placement_mask(move)
+        stride = self.stride
+
+        self.occupied[player] |= mask
+        # Nobody can play on these squares
+        for p in range(self.num_players):
+            self.blocked[p] |= mask
+        # This player can't play next to these squares
+        sides = (mask << 1) | (mask >> 1) | (mask << stride) | (mask >> stride)
+        self.blocked[player] |= sides & self.full
+        # The diagonals are now attached
+        diagonals = (mask << (stride + 1)) | (mask << (stride - 1)) | \
+                    (mask >> (stride + 1)) | (mask >> (stride - 1))
+        self.corners[player] |= diagonals & self.full
+
+        num_tiles = move.piece.get_num_tiles()
+        self.scores[player] += num_tiles
+        return num_tiles
+
+    def push_move(self, player, move):
+        """
+        Like add_move, but remembers the layers it changes so that pop_move
+        can take the move back.
+
+        Returns the number of tiles placed on the board.
+        """
+        undo = (player, move.piece_index, self.occupied[:], self.blocked[:], self.corners[:],
+                self.scores[player])
+        num_tiles = self.add_move(player, move)
+        self.undo.append(undo)
+        return num_tiles
+
+    def pop_move(self):
+        """
+        Take back the last move played with push_move.
+        """
+        player, piece_index, self.occupied, self.blocked, self.corners, score = self.undo.pop()
+        self.pieces[player, piece_index] = True
+        self.scores[player] = score
+
+    def do_move(self, player, move):
+        """
+        Performs a move, returning a new board
+        """
+        new_board = self.__copy__()
+        new_board.add_move(player, move)
+
+        return new_board
+
+    def get_legal_moves(self, player):
+        """
+        Returns a list of legal moves for given player for this board state
+
+        Like Board.get_legal_moves, only the placements covering an anchor
+        (a free corner attached to the player's tiles) are tried, and the
+        moves come out in the same order.
+        """
+        blocked = self.blocked[player]
+        anchors = [divmod(bit, self.stride)
+                   for bit in iter_bits(self.corners[player] & ~blocked & self.full)]
+
+        tried = set()
+        found = []
+        for piece_index, placements in enumerate(self.placements):
+            if not self.pieces[player, piece_index]:
+                continue
+            for (ay, ax) in anchors:
+                for ori_index, ori, dx, dy, width, height, mask in placements:
+                    (x, y) = (ax - dx, ay - dy)
+                    key = (piece_index, x, y, ori_index, ori)
+                    if key in tried:
+                        continue
+                    tried.add(key)
+                    if x < 0 or y < 0 or x + width > self.board_w or y + height > self.board_h:
+                        continue
+                    if not (mask << self.bit(x, y)) & blocked:
+                        found.append(key)
+        found.sort()
+
+        return [Move(self.piece_list.pieces[piece_index], piece_index, ori, x, y)
+                for (piece_index, x, y, _, ori) in found]
+
+    def sample_legal_move(self, player, rng=random, tries=SAMPLE_TRIES):
+        """
+        Returns a uniformly random legal move for given player, or None if
+        there is none, by rejection sampling like Board.sample_legal_move.
+        """
+        blocked = self.blocked[player]
+        anchor_mask = self.corners[player] & ~blocked & self.full
+        anchors = [divmod(bit, self.stride) for bit in iter_bits(anchor_mask)]
+        pieces = np.flatnonzero(self.pieces[player]).tolist()
+        if anchors and pieces:
+            weights = [len(self.placements[piece_index]) for piece_index in pieces]
+            for _ in range(tries):
+                (ay, ax) = rng.choice(anchors)
+                piece_index = rng.choices(pieces, weights)[0]
+                ori_index, ori, dx, dy, width, height, mask = rng.choice(self.placements[piece_index])
+                (x, y) = (ax - dx, ay - dy)
+                if x < 0 or y < 0 or x + width > self.board_w or y + height > self.board_h:
+                    continue
+                mask <<= self.bit(x, y)
+                if mask & blocked:
+                    continue
+                if rng.random() * bin(mask & anchor_mask).count('1') < 1:
+                    return Move(self.piece_list.pieces[piece_index], piece_index, ori, x, y)
+
+        moves = self.get_legal_moves(player)
+        return rng.choice(moves) if moves else None
+
+    def check_move_valid(self, player, move):
+        """
+        Check if <player> can legally perform <move>.
+
+        The move is valid iff its piece is available, it is in bounds, none of
+        its tiles is blocked for the player and at least one of them is on a
+        corner attached to the player's tiles.
+        """
+        if not self.pieces[player, move.piece_index]:
+            # piece has already been used
+            return False
+
+        mask = self.placement_mask(move)
+        if mask is None:
+            return False
+        return bool(mask & self.corners[player]) and not mask & self.blocked[player]
+
+    def check_tile_legal(self, player, x, y):
+        """
+        Check if it's legal for <player> to place one tile at (<x>, <y>).
+        """
+        if x < 0 or x >= self.board_w or y < 0 or y >= self.board_h:
+            return False
+        return not self.blocked[player] >> self.bit(x, y) & 1
+
+    def check_tile_attached(self, player, x, y):
+        """
+        Check if (<x>, <y>) is diagonally attached to <player>'s moves.
+        """
+        if x < 0 or x >= self.board_w or y < 0 or y >= self.board_h:
+            return False
+        return bool(self.corners[player] >> self.bit(x, y) & 1)
+
+    def get_position(self, x, y):
+        bit = self.bit(x, y)
+        for player, mask in enumerate(self.occupied):
+            if mask >> bit & 1:
+                return player
+        return -1
+
+    def score(self, player):
+        return self.scores[player]
+
+    def key(self):
+        """
+        Returns a compact immutable key of the board: the occupied layers
+        followed by the bitmask of available pieces.
+        """
+        return tuple(self.occupied) + (np.packbits(self.pieces).tobytes(),)
+
+    def __eq__(self, other):
+        return self.occupied == other.occupied and np.array_equal(self.pieces, other.pieces)
+
+    def __hash__(self):
+        return hash(tuple(self.occupied))
+
+    def __str__(self):
+        out_str = []
+        for y in range(self.board_h):
+            for x in range(self.board_w):
+                position = self.get_position(x, y)
+                out_str.append('_' if position == -1 else str(position))
+            out_str.append('\n')
+        return ''.join(out_str)
+
+    def __copy__(self):
+        cpy_board = BitBoard.__new__(BitBoard)
+        cpy_board.__dict__.update(self.__dict__)
+        cpy_board.occupied = self.occupied[:]
+        cpy_board.blocked = self.blocked[:]
+        cpy_board.corners = self.corners[:]
+        cpy_board.pieces = np.copy(self.pieces)
+        cpy_board.scores = self.scores[:]
+        cpy_board.undo = []
+        return cpy_board
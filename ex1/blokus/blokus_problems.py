@@ -1,7 +1,10 @@
 from board import Board
-from search import SearchProblem, ucs, astar
+from search import SearchProblem, ucs, astar, anytime
 
 from math import sqrt
+import functools
+import time
+import numpy as np
 import util
 
 
@@ -14,6 +17,7 @@ class BlokusFillProblem(SearchProblem):
     def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0)):
         self.board = Board(board_w, board_h, 1, piece_list, starting_point)
         self.expanded = 0
+        self.generated = 0
 
     def get_start_state(self):
         """
@@ -40,7 +44,28 @@ class BlokusFillProblem(SearchProblem):
         """
         # Note that for the search problem, there is only one player - #0
         self.expanded = self.expanded + 1
-        return [(state.do_move(0, move), move, 1) for move in state.get_legal_moves(0)]
+        successors = [(state.do_move(0, move), move, 1) for move in state.get_legal_moves(0)]
+        self.generated = self.generated + len(successors)
+        return successors
+
+    def get_moves(self, state):
+        """
+        Like get_successors, but returns (action, stepCost) pairs for the
+        in-place searches
+        """
+        self.expanded = self.expanded + 1
+        moves = [(move, 1) for move in state.get_legal_moves(0)]
+        self.generated = self.generated + len(moves)
+        return moves
+
+    def get_successor(self, state, action):
+        return state.do_move(0, action)
+
+    def push_action(self, state, action):
+        state.push_move(0, action)
+
+    def pop_action(self, state):
+        state.pop_move()
 
     def get_cost_of_actions(self, actions):
         """
@@ -59,6 +84,7 @@ class BlokusCornersProblem(SearchProblem):
     def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0)):
         self.board = Board(board_w, board_h, 1, piece_list, starting_point)
         self.expanded = 0
+        self.generated = 0
         self.PLAYER_ID = 0
         self.corners = [(0, 0), (board_w - 1, 0), (0, board_h - 1), (board_w - 1, board_h - 1)]
 
@@ -89,8 +115,29 @@ class BlokusCornersProblem(SearchProblem):
         """
         # Note that for the search problem, there is only one player - #0
         self.expanded = self.expanded + 1
-        return [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in
-                state.get_legal_moves(0)]
+        successors = [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in
+                       state.get_legal_moves(0)]
+        self.generated = self.generated + len(successors)
+        return successors
+
+    def get_moves(self, state):
+        """
+        Like get_successors, but returns (action, stepCost) pairs for the
+        in-place searches
+        """
+        self.expanded = self.expanded + 1
+        moves = [(move, move.piece.get_num_tiles()) for move in state.get_legal_moves(0)]
+        self.generated = self.generated + len(moves)
+        return moves
+
+    def get_successor(self, state, action):
+        return state.do_move(0, action)
+
+    def push_action(self, state, action):
+        state.push_move(0, action)
+
+    def pop_action(self, state):
+        state.pop_move()
 
     def get_cost_of_actions(self, actions):
         """
@@ -102,7 +149,7 @@ class BlokusCornersProblem(SearchProblem):
         total_cost = 0
         for move in actions:
             # sums the total number of tiles covered (given that there is no overlapping)
-            total_cost += move.piece.get_num_tiles
+            total_cost += move.piece.get_num_tiles()
         return total_cost
 
 
@@ -117,6 +164,60 @@ def distance(xy1, xy2):
     return (2 * manhattan + 6 * chebyshev + 2 * euclidean) / 10
 
 
+@functools.lru_cache(maxsize=None)
+def distance_field(board_w, board_h, target):
+    """
+    returns distance(target, (x, y)) for every tile (x, y) of the board, as a
+    read-only (board_h, board_w) array indexed [y, x].
+    """
+    y, x = np.mgrid[0:board_h, 0:board_w]
+    dx = np.abs(target[0] - x)
+    dy = np.abs(target[1] - y)
+    manhattan = dx + dy
+    chebyshev = np.maximum(dx, dy)
+    euclidean = np.sqrt(dx ** 2 + dy ** 2)
+    field = (2 * manhattan + 6 * chebyshev + 2 * euclidean) / 10
+    field.flags.writeable = False
+    return field
+
+
+def min_distance(occupied, target, default):
+    """
+    returns the smallest distance from target to a tile of the boolean mask
+    occupied (indexed [y, x]), or default if it is smaller or there is none.
+    """
+    board_h, board_w = occupied.shape
+    distances = distance_field(board_w, board_h, tuple(target))[occupied]
+    if distances.size == 0:
+        return default
+    return min(default, float(distances.min()))
+
+
+# Number of heuristic values memoized per problem by memoize_heuristic
+HEURISTIC_CACHE_SIZE = 100000
+
+
+def memoize_heuristic(heuristic):
+    """
+    memoizes heuristic(state, problem) by state.key(), in a bounded LRU cache
+    kept on the problem (so a value is only reused for the same targets).
+    """
+    @functools.wraps(heuristic)
+    def memoized(state, problem):
+        caches = problem.__dict__.setdefault('heuristic_caches', {})
+        cache = caches.get(heuristic)
+        if cache is None:
+            cache = caches[heuristic] = util.LRUCache(HEURISTIC_CACHE_SIZE)
+        key = state.key()
+        value = cache.get(key)
+        if value is None:
+            value = heuristic(state, problem)
+            cache.put(key, value)
+        return value
+    return memoized
+
+
+@memoize_heuristic
 def blokus_corners_heuristic(state, problem):
     """
     returns the sum of median distance of groups of corners that can be
@@ -148,18 +249,12 @@ def blokus_corners_heuristic(state, problem):
         if closest_t_1 not in target_groups:
             target_groups.append(closest_t_1)
 
-    occupied_tiles = []
-    for x in range(state.board_w):
-        for y in range(state.board_h):
-            if state.get_position(x, y) == 0:
-                occupied_tiles.append((x, y))
+    occupied = state.state == 0
 
     for group in target_groups:
         # get median of the group
         target = group[len(group) // 2]
-        min_dist = state.board_w * state.board_h
-        for tile in occupied_tiles:
-            min_dist = min(min_dist, distance(target, tile))
+        min_dist = min_distance(occupied, target, state.board_w * state.board_h)
         cost += min_dist
 
     return cost
@@ -185,6 +280,7 @@ class BlokusCoverProblem(SearchProblem):
         self.board = Board(board_w, board_h, 1, piece_list, starting_point)
         self.targets = targets.copy()
         self.expanded = 0
+        self.generated = 0
         self.PLAYER_ID = 0
 
     def get_start_state(self):
@@ -217,8 +313,29 @@ class BlokusCoverProblem(SearchProblem):
         """
         # Note that for the search problem, there is only one player - #0
         self.expanded = self.expanded + 1
-        return [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in
-                state.get_legal_moves(0)]
+        successors = [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in
+                       state.get_legal_moves(0)]
+        self.generated = self.generated + len(successors)
+        return successors
+
+    def get_moves(self, state):
+        """
+        Like get_successors, but returns (action, stepCost) pairs for the
+        in-place searches
+        """
+        self.expanded = self.expanded + 1
+        moves = [(move, move.piece.get_num_tiles()) for move in state.get_legal_moves(0)]
+        self.generated = self.generated + len(moves)
+        return moves
+
+    def get_successor(self, state, action):
+        return state.do_move(0, action)
+
+    def push_action(self, state, action):
+        state.push_move(0, action)
+
+    def pop_action(self, state):
+        state.pop_move()
 
     def get_cost_of_actions(self, actions):
         """
@@ -234,6 +351,7 @@ class BlokusCoverProblem(SearchProblem):
         return total_cost
 
 
+@memoize_heuristic
 def blokus_cover_heuristic(state, problem):
     """
     returns the max of median distance of groups of targets that can be
@@ -264,18 +382,12 @@ def blokus_cover_heuristic(state, problem):
         if closest_t_1 not in target_groups:
             target_groups.append(closest_t_1)
 
-    occupied_tiles = []
-    for x in range(state.board_w):
-        for y in range(state.board_h):
-            if state.get_position(x, y) == 0:
-                occupied_tiles.append((x, y))
+    occupied = state.state == 0
 
     for group in target_groups:
         # get median of the group
         target = group[len(group) // 2]
-        min_dist = state.board_w * state.board_h
-        for tile in occupied_tiles:
-            min_dist = min(min_dist, distance(target, tile))
+        min_dist = min_distance(occupied, target, state.board_w * state.board_h)
         if cost < min_dist:
             cost = min_dist
 
@@ -283,20 +395,72 @@ def blokus_cover_heuristic(state, problem):
     return (cost + len(vacant_targets)) // 2
 
 
+@memoize_heuristic
+def suboptimal_heuristic(state, problem):
+    """
+    heuristic of the sub-optimal searches: the average of the sum of min
+    distances from the placed pieces to the vacant targets, and the number
+    of vacant targets.
+    """
+    # IDEA: distance from placed pieces to the vacant corners
+    # cost is the sum of min dist from the placed pieces to each of vacant corners
+    cost = 0
+    vacant_targets = [target for target in problem.targets
+                      if state.get_position(target[1], target[0]) == -1]
+    # at least one unreachable corner, path is not useful
+    for target in vacant_targets:
+        if not is_reachable(state, *target):
+            # longest path in the board multiply number of vacant targets
+            return state.board_w * state.board_h
+
+    # get set of closest targets lists
+    target_groups = []
+    for t_1 in vacant_targets:
+        closest_t_1 = []
+        for t_2 in vacant_targets:
+            if distance(t_1, t_2) < 5:
+                closest_t_1.append(t_2)
+        # sort according to dist from (0,0)
+        closest_t_1.sort(key=lambda x: distance(x, (0, 0)))
+        if closest_t_1 not in target_groups:
+            target_groups.append(closest_t_1)
+
+    occupied = state.state == 0
+
+    for group in target_groups:
+        # get median of the group
+        target = group[len(group) // 2]
+        min_dist = min_distance(occupied, target, state.board_w + state.board_h)
+        cost += min_dist
+
+    # average of two heuristics: sum of dists to left goals, and left goals
+    return (cost + len(vacant_targets)) // 2
+
+
+# Seconds the sub-optimal searches may take to solve a puzzle
+SUBOPTIMAL_TIME_LIMIT = 10.0
+
+
 class ClosestLocationSearch:
     """
     In this problem you have to cover all given positions on the board,
     but the objective is speed, not optimality.
     """
-    def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0), targets=(0, 0)):
+    def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0), targets=(0, 0),
+                 time_limit=SUBOPTIMAL_TIME_LIMIT):
         self.board = Board(board_w, board_h, 1, piece_list, starting_point)
         self.starting_point = starting_point
         self.expanded = 0
+        self.generated = 0
         self.targets = targets.copy()
         # make targets iterable (if there is more than one, it is already list)
         if len(self.targets) == 1:
             self.targets = [self.targets]
         self.PLAYER_ID = 0
+        self.time_limit = time_limit
+        # cost of the returned plan, and (seconds, cost, expanded) of every improvement
+        self.cost = None
+        self.improvements = []
 
     def get_start_state(self):
         """
@@ -306,159 +470,27 @@ class ClosestLocationSearch:
 
     def solve(self):
         """
-        return a sequence of actions that covers the given target in the problem.
-        where the method id to cover each time the current closest target available.
-        """
-        def suboptimal_heuristic(state, problem):
-            # IDEA: distance from placed pieces to the vacant corners
-            # cost is the sum of min dist from the placed pieces to each of vacant corners
-            cost = 0
-            vacant_targets = [target for target in problem.targets
-                              if state.get_position(target[1], target[0]) == -1]
-            # at least one unreachable corner, path is not useful
-            for target in vacant_targets:
-                if not is_reachable(state, *target):
-                    # longest path in the board multiply number of vacant targets
-                    return state.board_w * state.board_h
-
-            # get set of closest targets lists
-            target_groups = []
-            for t_1 in vacant_targets:
-                closest_t_1 = []
-                for t_2 in vacant_targets:
-                    if distance(t_1, t_2) < 5:
-                        closest_t_1.append(t_2)
-                # sort according to dist from (0,0)
-                closest_t_1.sort(key=lambda x: distance(x, (0, 0)))
-                if closest_t_1 not in target_groups:
-                    target_groups.append(closest_t_1)
-
-            occupied_tiles = []
-            for x in range(state.board_w):
-                for y in range(state.board_h):
-                    if state.get_position(x, y) == 0:
-                        occupied_tiles.append((x, y))
-
-            for group in target_groups:
-                # get median of the group
-                target = group[len(group) // 2]
-                min_dist = state.board_w + state.board_h
-                for tile in occupied_tiles:
-                    min_dist = min(min_dist, distance(target, tile))
-                cost += min_dist
-
-            # average of two heuristics: sum of dists to left goals, and left goals
-            return (cost + len(vacant_targets)) // 2
-
-        current_state = self.board.__copy__()
-        backtrace = []
-        # iterate over targets
-        targets = self.targets.copy()
-        targets.sort(key=lambda tile: distance(self.starting_point, tile))
-        while targets:
-            # initialize a problem that is exactly the current state
-            problem = BlokusCoverProblem(current_state.board_w, current_state.board_h,
-                                         current_state.piece_list, self.starting_point,
-                                         [targets[0]])
-            problem.change_board(current_state)
-            # get list of actions from current_state to target
-            actions = astar(problem, suboptimal_heuristic)
-            self.expanded += problem.expanded
-            # update the backtrace and the board
-            for action in actions:
-                backtrace.append(action)
-                current_state = current_state.do_move(0, action)
-            targets = targets[1:]
+        return a sequence of actions that covers the given targets in the problem, found
+        within self.time_limit seconds (later if it takes longer to find any): a beam search
+        gives a first plan, then ARA* with decreasing weights looks for cheaper ones while
+        time remains.
+        """
+        problem = BlokusCoverProblem(self.board.board_w, self.board.board_h, self.board.piece_list,
+                                     self.starting_point, self.targets)
+        problem.change_board(self.board.__copy__())
+        start_time = time.time()
 
+        def record(actions, cost):
+            self.cost = cost
+            self.improvements.append((time.time() - start_time, cost, problem.expanded))
+
+        backtrace = anytime(problem, suboptimal_heuristic, self.time_limit, on_solution=record)
+        self.expanded += problem.expanded
+        self.generated += problem.generated
         return backtrace
 
 
-class MiniContestSearch:
+class MiniContestSearch(ClosestLocationSearch):
     """
     Implement your contest entry here
     """
-
-    def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0), targets=(0, 0)):
-        self.board = Board(board_w, board_h, 1, piece_list, starting_point)
-        self.starting_point = starting_point
-        self.expanded = 0
-        self.targets = targets.copy()
-        # make targets iterable (if there is more than one, it is already list)
-        if len(self.targets) == 1:
-            self.targets = [self.targets]
-        self.PLAYER_ID = 0
-
-    def get_start_state(self):
-        """
-        Returns the start state for the search problem
-        """
-        return self.board
-
-    def solve(self):
-        """
-        return a sequence of actions that covers the given target in the problem. where the method id to cover each
-        time the current closest target available.
-        """
-
-        def suboptimal_heuristic(state, problem):
-            # IDEA: distance from placed pieces to the vacant corners
-            # cost is the sum of min dist from the placed pieces to each of vacant corners
-            cost = 0
-            vacant_targets = [target for target in problem.targets
-                              if state.get_position(target[1], target[0]) == -1]
-            # at least one unreachable corner, path is not useful
-            for target in vacant_targets:
-                if not is_reachable(state, *target):
-                    # longest path in the board multiply number of vacant targets
-                    return state.board_w * state.board_h
-
-            # get set of closest targets lists
-            target_groups = []
-            for t_1 in vacant_targets:
-                closest_t_1 = []
-                for t_2 in vacant_targets:
-                    if distance(t_1, t_2) < 5:
-                        closest_t_1.append(t_2)
-                # sort according to dist from (0,0)
-                closest_t_1.sort(key=lambda x: distance(x, (0, 0)))
-                if closest_t_1 not in target_groups:
-                    target_groups.append(closest_t_1)
-
-            occupied_tiles = []
-            for x in range(state.board_w):
-                for y in range(state.board_h):
-                    if state.get_position(x, y) == 0:
-                        occupied_tiles.append((x, y))
-
-            for group in target_groups:
-                # get median of the group
-                target = group[len(group) // 2]
-                min_dist = state.board_w + state.board_h
-                for tile in occupied_tiles:
-                    min_dist = min(min_dist, distance(target, tile))
-                cost += min_dist
-
-            # average of two heuristics: sum of dists to left goals, and left goals
-            return (cost + len(vacant_targets)) // 2
-
-        current_state = self.board.__copy__()
-        backtrace = []
-        # iterate over targets
-        targets = self.targets.copy()
-        targets.sort(key=lambda tile: distance(self.starting_point, tile))
-        while targets:
-            # initialize a problem that is exactly the current state
-            problem = BlokusCoverProblem(current_state.board_w, current_state.board_h,
-                                         current_state.piece_list, self.starting_point,
-                                         [targets[0]])
-            problem.change_board(current_state)
-            # get list of actions from current_state to target
-            actions = astar(problem, suboptimal_heuristic)
-            self.expanded += problem.expanded
-            # update the backtrace and the board
-            for action in actions:
-                backtrace.append(action)
-                current_state = current_state.do_move(0, action)
-            targets = targets[1:]
-
-        return backtrace
\ No newline at end of file
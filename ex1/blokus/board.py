@@ -1,6 +1,54 @@
+import random
+from functools import lru_cache
+
 import numpy as np
 
 
+@lru_cache(maxsize=None)
+def anchor_placements(piece_list):
+    """
+    For every piece of <piece_list>, list all the ways to put one of its tiles
+    on a given anchor tile.
+
+    Returns a list (indexed like piece_list.pieces) of lists of
+    (orientation index, orientation, dx, dy, width, height) tuples: playing
+    the orientation at (anchor_x - dx, anchor_y - dy) puts its (dx, dy) tile
+    on the anchor, and width/height is its bounding box. Orientation indices
+    follow the iteration order of the piece (see PieceList.packed).
+    """
+    table = []
+    for orientations in piece_list.packed:
+        placements = []
+        for packed in orientations:
+            for (dx, dy) in packed.orientation:
+                placements.append((packed.index, packed.orientation, dx, dy, packed.width, packed.height))
+        table.append(placements)
+    return table
+
+
+# Candidates Board.sample_legal_move draws before listing all the legal moves
+SAMPLE_TRIES = 64
+# The tracked moves covering a tile no move covers (see Board._moves_at)
+NO_MOVES = frozenset()
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(board_w, board_h, num_players, num_pieces):
+    """
+    Random 64 bit keys for Zobrist hashing of boards of the given shape.
+
+    Returns (tile_keys, piece_keys): tile_keys[player][y][x] stands for a tile
+    of <player> at (x, y) and piece_keys[player][n] for piece n still being
+    available to <player>. The keys only depend on the shape, so equal boards
+    always get equal hashes.
+    """
+    rand = random.Random(board_w * 1000003 + board_h * 1009 + num_players * 101 + num_pieces)
+    tile_keys = [[[rand.getrandbits(64) for _ in range(board_w)] for _ in range(board_h)]
+                 for _ in range(num_players)]
+    piece_keys = [[rand.getrandbits(64) for _ in range(num_pieces)] for _ in range(num_players)]
+    return tile_keys, piece_keys
+
+
 class Board:
 
     """
@@ -17,9 +65,25 @@ class Board:
       diagonally connected to another one of the player's tiles
     - piece_list: A PieceList object (probably shared with the game engine) to
       help understand the moves
+    - _hash: the Zobrist hash of state and pieces, kept up to date by add_move
+    - _key: the cached key() of the board, or None if it has to be rebuilt
+    - _undo: the stack of the changes made by push_move, undone by pop_move
+
+    If track_moves is set, the Board also carries the legal moves of each
+    player (computed the first time they are asked for) and updates them in
+    add_move instead of regenerating them:
+    - _moves: _moves[player][piece_index] is the dict of the legal moves with
+      that piece, {(piece_index, x, y, ori_index, ori): covered tiles}, or
+      None if there is none
+    - _moves_at: _moves_at[player][y][x] is the frozenset of the keys of the
+      moves covering (x, y)
+    Both are copied on write by bucket: a move copies the short lists of
+    pieces and of rows, and only the piece dicts and rows it changes, so
+    boards made by do_move share everything else with their parent.
     """
 
-    def __init__(self, board_w, board_h, num_players, piece_list, starting_point=(0, 0)):
+    def __init__(self, board_w, board_h, num_players, piece_list, starting_point=(0, 0),
+                 track_moves=False):
         self.board_w = board_w
         self.board_h = board_h
         self.num_players = num_players
@@ -34,6 +98,29 @@ class Board:
         self.piece_list = piece_list
         self.pieces = np.full((num_players, piece_list.get_num_pieces()), True, np.bool_)
 
+        self._hash = 0
+        for keys in zobrist_keys(board_w, board_h, num_players, piece_list.get_num_pieces())[1]:
+            for key in keys:
+                self._hash ^= key
+        self._key = None
+
+        self.track_moves = False
+        self._moves = None
+        self._moves_at = None
+        self._undo = []
+        if track_moves:
+            self.track_legal_moves()
+
+    def track_legal_moves(self):
+        """
+        Start keeping the legal moves of every player up to date in add_move.
+
+        Call this only once the starting corners of all players are set.
+        """
+        self.track_moves = True
+        self._moves = [None] * self.num_players
+        self._moves_at = [None] * self.num_players
+
     def add_move(self, player, move):
         """
         Try to add <player>'s <move>.
@@ -48,11 +135,16 @@ class Board:
 
         piece = move.piece
         self.pieces[player, move.piece_index] = False  # mark piece as used
+        tile_keys, piece_keys = zobrist_keys(self.board_w, self.board_h, self.num_players,
+                                             self.piece_list.get_num_pieces())
+        self._hash ^= piece_keys[player][move.piece_index]
+        self._key = None
 
         # Update internal state for each tile
         for (xi, yi) in move.orientation:
             (x, y) = (xi + move.x, yi + move.y)
             self.state[y, x] = player
+            self._hash ^= tile_keys[player][y][x]
 
             # Nobody can play on this square
             for p in range(self.num_players):
@@ -78,9 +170,133 @@ class Board:
             if x < self.board_w - 1 and y > 0:
                 self.connected[player, y - 1, x + 1] = True
 
+        if self.track_moves:
+            self._update_moves(player, move)
+
         self.scores[player] += piece.get_num_tiles()
         return piece.get_num_tiles()
 
+    def _update_moves(self, player, move):
+        """
+        Update the tracked legal moves after <player> played <move>.
+
+        Every player loses the moves overlapping the new tiles; <player> also
+        loses the moves with the used piece and the moves touching the new
+        tiles, and gains the moves on the new corners of the piece.
+        """
+        tiles = [(xi + move.x, yi + move.y) for (xi, yi) in move.orientation]
+        sides = set()
+        diagonals = set()
+        for (x, y) in tiles:
+            sides.update([(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)])
+            diagonals.update([(x - 1, y - 1), (x + 1, y - 1), (x - 1, y + 1), (x + 1, y + 1)])
+
+        for p in range(self.num_players):
+            if self._moves[p] is None:
+                continue
+            moves = self._moves[p][:]
+            moves_at = self._moves_at[p][:]
+            copied_pieces = set()
+            copied_rows = set()
+
+            dead = set(tiles)
+            dropped = {}
+            if p == player:
+                dead |= sides
+                dropped.update(moves[move.piece_index] or {})
+                moves[move.piece_index] = None
+            for (x, y) in dead:
+                if not (0 <= x < self.board_w and 0 <= y < self.board_h) or not moves_at[y][x]:
+                    continue
+                if y not in copied_rows:
+                    moves_at[y] = moves_at[y][:]
+                    copied_rows.add(y)
+                for key in moves_at[y][x]:
+                    if key in dropped:
+                        continue
+                    if key[0] not in copied_pieces:
+                        moves[key[0]] = dict(moves[key[0]])
+                        copied_pieces.add(key[0])
+                    dropped[key] = moves[key[0]].pop(key)
+                moves_at[y][x] = NO_MOVES
+            for piece_index in copied_pieces:
+                if not moves[piece_index]:
+                    moves[piece_index] = None
+
+            # Remove the dropped moves from the tiles that are still alive
+            stale = {}
+            for key, key_tiles in dropped.items():
+                for tile in key_tiles:
+                    if tile not in dead:
+                        stale.setdefault(tile, set()).add(key)
+            for (x, y), keys in stale.items():
+                if y not in copied_rows:
+                    moves_at[y] = moves_at[y][:]
+                    copied_rows.add(y)
+                moves_at[y][x] = moves_at[y][x] - keys
+
+            if p == player:
+                anchors = [(y, x) for (x, y) in diagonals
+                           if 0 <= x < self.board_w and 0 <= y < self.board_h and self._legal[p, y, x]]
+                fresh = {}
+                for key, key_tiles in self._find_moves(p, anchors).items():
+                    if moves[key[0]] is not None and key in moves[key[0]]:
+                        continue
+                    if key[0] not in copied_pieces or moves[key[0]] is None:
+                        moves[key[0]] = dict(moves[key[0]] or {})
+                        copied_pieces.add(key[0])
+                    moves[key[0]][key] = key_tiles
+                    for tile in key_tiles:
+                        fresh.setdefault(tile, set()).add(key)
+                for (x, y), keys in fresh.items():
+                    if y not in copied_rows:
+                        moves_at[y] = moves_at[y][:]
+                        copied_rows.add(y)
+                    moves_at[y][x] = moves_at[y][x] | keys
+
+            self._moves[p] = moves
+            self._moves_at[p] = moves_at
+
+    def push_move(self, player, move):
+        """
+        Like add_move, but remembers what <move> changed so that pop_move can
+        take it back. Lets a search walk the tree on a single board instead
+        of copying it for every node.
+
+        Returns the number of tiles placed on the board.
+        """
+        xs = [xi + move.x for (xi, yi) in move.orientation]
+        ys = [yi + move.y for (xi, yi) in move.orientation]
+        # Every cell add_move may change is within one tile of the piece
+        rows = slice(max(min(ys) - 1, 0), max(max(ys) + 2, 0))
+        cols = slice(max(min(xs) - 1, 0), max(max(xs) + 2, 0))
+        undo = (player, move.piece_index, rows, cols,
+                self.state[rows, cols].copy(), self._legal[:, rows, cols].copy(),
+                self.connected[:, rows, cols].copy(), self.scores[player], self._hash, self._key,
+                self._moves[:] if self.track_moves else None,
+                self._moves_at[:] if self.track_moves else None)
+
+        num_tiles = self.add_move(player, move)
+        self._undo.append(undo)
+        return num_tiles
+
+    def pop_move(self):
+        """
+        Take back the last move played with push_move.
+        """
+        (player, piece_index, rows, cols, state, legal, connected, score, zobrist, key,
+         moves, moves_at) = self._undo.pop()
+        self.state[rows, cols] = state
+        self._legal[:, rows, cols] = legal
+        self.connected[:, rows, cols] = connected
+        self.pieces[player, piece_index] = True
+        self.scores[player] = score
+        self._hash = zobrist
+        self._key = key
+        if self.track_moves:
+            self._moves = moves
+            self._moves_at = moves_at
+
     def do_move(self, player, move):
         """
         Performs a move, returning a new board
@@ -93,19 +309,112 @@ class Board:
     def get_legal_moves(self, player):
         """
         Returns a list of legal moves for given player for this board state 
+
+        Every legal move covers at least one anchor: a free tile diagonally
+        attached to the player's tiles. So only the placements putting one of
+        the piece's tiles on an anchor are tried, each (piece, orientation,
+        x, y) at most once. The moves are ordered by piece, x, y and
+        orientation.
+        """
+        if not self.track_moves:
+            anchors = np.argwhere(self.connected[player] & self._legal[player]).tolist()
+            keys = list(self._find_moves(player, anchors))
+        else:
+            if self._moves[player] is None:
+                self._set_moves(player)
+            keys = [key for moves in self._moves[player] if moves for key in moves]
+        keys.sort()
+
+        return [Move(self.piece_list.pieces[piece_index], piece_index, ori, x, y)
+                for (piece_index, x, y, _, ori) in keys]
+
+    def sample_legal_move(self, player, rng=random, tries=SAMPLE_TRIES):
+        """
+        Returns a uniformly random legal move for given player, or None if
+        there is none, without listing all the legal moves.
+
+        A candidate is an anchor and one of the ways to put a remaining piece
+        on it (see anchor_placements), drawn uniformly. A legal move can be
+        drawn through each of the m anchors it covers, so a legal candidate
+        is accepted with probability 1 / m. After <tries> rejected candidates
+        (few legal moves left), one of get_legal_moves is chosen instead.
+        """
+        anchors = np.argwhere(self.connected[player] & self._legal[player]).tolist()
+        pieces = np.flatnonzero(self.pieces[player]).tolist()
+        if anchors and pieces:
+            table = anchor_placements(self.piece_list)
+            weights = [len(table[piece_index]) for piece_index in pieces]
+            legal = self._legal[player].tolist()
+            connected = self.connected[player].tolist()
+            for _ in range(tries):
+                (ay, ax) = rng.choice(anchors)
+                piece_index = rng.choices(pieces, weights)[0]
+                ori_index, ori, dx, dy, width, height = rng.choice(table[piece_index])
+                (x, y) = (ax - dx, ay - dy)
+                if x < 0 or y < 0 or x + width > self.board_w or y + height > self.board_h:
+                    continue
+                if not self.check_orientation_fits(legal, ori, x, y):
+                    continue
+                covered = sum(connected[yi + y][xi + x] for (xi, yi) in ori)
+                if rng.random() * covered < 1:
+                    return Move(self.piece_list.pieces[piece_index], piece_index, ori, x, y)
+
+        moves = self.get_legal_moves(player)
+        return rng.choice(moves) if moves else None
+
+    def _find_moves(self, player, anchors):
+        """
+        Returns the legal moves of <player> covering one of <anchors>, a list
+        of (y, x) tiles, as a dict {(piece_index, x, y, ori_index, ori): tiles}
+        """
+        legal = self._legal[player].tolist()
+        table = anchor_placements(self.piece_list)
+
+        tried = set()
+        found = {}
+        for piece_index, placements in enumerate(table):
+            if not self.pieces[player, piece_index]:
+                continue
+            for (ay, ax) in anchors:
+                for ori_index, ori, dx, dy, width, height in placements:
+                    (x, y) = (ax - dx, ay - dy)
+                    if x < 0 or y < 0 or x + width > self.board_w or y + height > self.board_h:
+                        continue
+                    key = (piece_index, x, y, ori_index, ori)
+                    if key in tried:
+                        continue
+                    tried.add(key)
+                    if self.check_orientation_fits(legal, ori, x, y):
+                        found[key] = tuple((xi + x, yi + y) for (xi, yi) in ori)
+        return found
+
+    def _set_moves(self, player):
+        """
+        Compute the tracked legal moves of <player> from scratch.
         """
-        # Generate all legal moves
-        move_list = []
-        for piece in self.piece_list:
-            for x in range(self.board_w):
-                for y in range(self.board_h):
-                    for ori in piece:
-                        new_move = Move(piece,
-                                        self.piece_list.pieces.index(piece),
-                                        ori, x, y)
-                        if self.check_move_valid(player, new_move):
-                            move_list.append(new_move)
-        return move_list
+        anchors = np.argwhere(self.connected[player] & self._legal[player]).tolist()
+        moves = [None] * self.piece_list.get_num_pieces()
+        moves_at = [[set() for _ in range(self.board_w)] for _ in range(self.board_h)]
+        for key, tiles in self._find_moves(player, anchors).items():
+            if moves[key[0]] is None:
+                moves[key[0]] = {}
+            moves[key[0]][key] = tiles
+            for (x, y) in tiles:
+                moves_at[y][x].add(key)
+        self._moves[player] = moves
+        self._moves_at[player] = [[frozenset(keys) if keys else NO_MOVES for keys in row] for row in moves_at]
+
+    def check_orientation_fits(self, legal, orientation, x, y):
+        """
+        Check if every tile of <orientation> played at (<x>, <y>) is in bounds
+        and legal according to <legal>, one player's layer of _legal as nested
+        lists.
+        """
+        for (xi, yi) in orientation:
+            (xi, yi) = (xi + x, yi + y)
+            if xi < 0 or xi >= self.board_w or yi < 0 or yi >= self.board_h or not legal[yi][xi]:
+                return False
+        return True
 
     def check_move_valid(self, player, move):
         """
@@ -124,6 +433,22 @@ class Board:
             # piece has already been used
             return False
 
+        # Reject moves sticking out of the board by their bounding box
+        packed = self.piece_list.packed_index[move.piece_index].get(move.orientation)
+        if packed is not None:
+            if (move.x < 0 or move.y < 0 or move.x + packed.width > self.board_w or
+                    move.y + packed.height > self.board_h):
+                return False
+            legal = self._legal[player]
+            connected = self.connected[player]
+            attached_corner = False
+            for (x, y) in move.orientation:
+                if not legal[y + move.y, x + move.x]:
+                    return False
+                if connected[y + move.y, x + move.x]:
+                    attached_corner = True
+            return attached_corner
+
         attached_corner = False
 
         for (x, y) in move.orientation:
@@ -177,11 +502,64 @@ class Board:
     def score(self, player):
         return self.scores[player]
 
+    def key(self):
+        """
+        Returns a compact immutable key of the board: the bytes of state
+        followed by the bitmask of available pieces. Two boards are equal iff
+        their keys are equal.
+        """
+        if self._key is None:
+            self._key = self.state.tobytes() + np.packbits(self.pieces).tobytes()
+        return self._key
+
+    def from_key(self, key):
+        """
+        Returns a board of the same game as this one in the position of <key>
+        (a key() of such a board). This board has to be the start of the game,
+        with no move played: its connected tiles are the starting corners.
+        """
+        board = self.__copy__()
+        size = self.board_w * self.board_h
+        board.state = np.frombuffer(key, np.int8, size).reshape(self.board_h, self.board_w).copy()
+        board.pieces = np.unpackbits(np.frombuffer(key, np.uint8, offset=size),
+                                     count=self.pieces.size).astype(np.bool_).reshape(self.pieces.shape)
+        tile_keys, piece_keys = zobrist_keys(self.board_w, self.board_h, self.num_players,
+                                             self.piece_list.get_num_pieces())
+        board._hash = 0
+        free = board.state == -1
+        for p in range(self.num_players):
+            own = board.state == p
+            board.scores[p] = int(own.sum())
+            for y, x in zip(*np.nonzero(own)):
+                board._hash ^= tile_keys[p][y][x]
+            for piece_index in np.flatnonzero(board.pieces[p]):
+                board._hash ^= piece_keys[p][piece_index]
+
+            # Free tiles not next to the player's tiles are legal for it
+            sides = np.zeros_like(own)
+            sides[1:, :] |= own[:-1, :]
+            sides[:-1, :] |= own[1:, :]
+            sides[:, 1:] |= own[:, :-1]
+            sides[:, :-1] |= own[:, 1:]
+            board._legal[p] = free & ~sides
+
+            diagonals = np.zeros_like(own)
+            diagonals[1:, 1:] |= own[:-1, :-1]
+            diagonals[1:, :-1] |= own[:-1, 1:]
+            diagonals[:-1, 1:] |= own[1:, :-1]
+            diagonals[:-1, :-1] |= own[1:, 1:]
+            board.connected[p] = self.connected[p] | diagonals
+        board._key = bytes(key)
+        if self.track_moves:
+            # Computed again the first time they are asked for
+            board.track_legal_moves()
+        return board
+
     def __eq__(self, other):
-        return np.array_equal(self.state, other.state) and np.array_equal(self.pieces, other.pieces)
+        return self._hash == other._hash and self.key() == other.key()
 
     def __hash__(self):
-        return hash(str(self.state))
+        return self._hash
 
     def __str__(self):
         out_str = []
@@ -201,6 +579,13 @@ class Board:
         cpy_board.connected = np.copy(self.connected)
         cpy_board.pieces = np.copy(self.pieces)
         cpy_board.scores = self.scores[:]
+        cpy_board._hash = self._hash
+        cpy_board._key = self._key
+        if self.track_moves:
+            # add_move never changes these containers in place, so share them
+            cpy_board.track_moves = True
+            cpy_board._moves = self._moves[:]
+            cpy_board._moves_at = self._moves_at[:]
         return cpy_board
 
 
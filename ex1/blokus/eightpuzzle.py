@@ -6,8 +6,28 @@
 # John DeNero (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
-import search
+import copy
+import math
 import random
+from functools import lru_cache
+
+import search
+
+
+def tile_bits(size):
+    """
+      The bits each number takes in the packed configuration of a
+    size x size puzzle: 4 up to the fifteen puzzle.
+    """
+    return max(4, (size * size - 1).bit_length())
+
+
+@lru_cache(maxsize=None)
+def goal_packed(size):
+    """
+      The packed goal of a size x size puzzle: number i in cell i.
+    """
+    return sum(number << (number * tile_bits(size)) for number in range(size * size))
 
 
 # Module Classes
@@ -20,6 +40,9 @@ class EightPuzzleState(search.SearchProblem):
     This class defines the mechanics of the puzzle itself.  The
     task of recasting this puzzle as a search problem is left to
     the EightPuzzleSearchProblem class.
+
+    Any N x N sliding puzzle works the same way (N = 4 is the fifteen
+    puzzle); the size is taken from the number of cells.
     """
 
     def __init__(self, numbers):
@@ -41,18 +64,36 @@ class EightPuzzleState(search.SearchProblem):
             | 6 | 7 | 8 |
             ------------
 
-        The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
+        The configuration of the puzzle is packed in one integer,
+        'packed': the number in cell i (in row-major order) is held in
+        bits i * bits to (i + 1) * bits, 4 bits per number up to the
+        fifteen puzzle.
+        """
+        self.size = math.isqrt(len(numbers))
+        if self.size * self.size != len(numbers):
+            raise Exception("A puzzle has N x N cells")
+        self.bits = tile_bits(self.size)
+        self.packed = 0
+        for cell, number in enumerate(numbers):
+            self.packed |= number << (cell * self.bits)
+            if number == 0:
+                self.blankLocation = divmod(cell, self.size)
+        self._undo = []
+
+    @property
+    def cells(self):
         """
-        self.cells = []
-        numbers = numbers[:]  # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range(3):
-            self.cells.append([])
-            for col in range(3):
-                self.cells[row].append(numbers.pop())
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+          The configuration as a 2-dimensional list (a list of lists).
+        """
+        numbers = self.numbers()
+        return [numbers[row * self.size:(row + 1) * self.size] for row in range(self.size)]
+
+    def numbers(self):
+        """
+          The numbers of the cells, in row-major order.
+        """
+        mask = (1 << self.bits) - 1
+        return [(self.packed >> (cell * self.bits)) & mask for cell in range(self.size * self.size)]
 
     def is_goal_state(self):
         """
@@ -66,19 +107,13 @@ class EightPuzzleState(search.SearchProblem):
             | 6 | 7 | 8 |
             -------------
 
-        >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).get_start_state()
+        >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).is_goal_state()
         True
 
-        >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).get_start_state()
+        >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).is_goal_state()
         False
         """
-        current = 0
-        for row in range(3):
-            for col in range(3):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return self.packed == goal_packed(self.size)
 
     def legalMoves(self):
         """
@@ -94,52 +129,68 @@ class EightPuzzleState(search.SearchProblem):
         row, col = self.blankLocation
         if (row != 0):
             moves.append('up')
-        if (row != 2):
+        if (row != self.size - 1):
             moves.append('down')
         if (col != 0):
             moves.append('left')
-        if (col != 2):
+        if (col != self.size - 1):
             moves.append('right')
         return moves
 
-    def result(self, move):
+    def _slide(self, move):
         """
-          Returns a new eightPuzzle with the current state and blankLocation
-        updated based on the provided move.
-
-        The move should be a string drawn from a list returned by legalMoves.
-        Illegal moves will raise an exception, which may be an array bounds
-        exception.
-
-        NOTE: This function *does not* change the current object.  Instead,
-        it returns a new object.
+          Returns (packed, blankLocation) after the blank is moved: the
+        number next to the blank takes its place.
         """
         row, col = self.blankLocation
         if (move == 'up'):
-            newrow = row - 1
-            newcol = col
+            newrow, newcol = row - 1, col
         elif (move == 'down'):
-            newrow = row + 1
-            newcol = col
+            newrow, newcol = row + 1, col
         elif (move == 'left'):
-            newrow = row
-            newcol = col - 1
+            newrow, newcol = row, col - 1
         elif (move == 'right'):
-            newrow = row
-            newcol = col + 1
+            newrow, newcol = row, col + 1
         else:
             raise Exception("Illegal Move")
+        if not (0 <= newrow < self.size and 0 <= newcol < self.size):
+            raise Exception("Illegal Move")
+
+        blank = (row * self.size + col) * self.bits
+        moved = (newrow * self.size + newcol) * self.bits
+        number = (self.packed >> moved) & ((1 << self.bits) - 1)
+        return self.packed + (number << blank) - (number << moved), (newrow, newcol)
+
+    def result(self, move):
+        """
+          Returns a new eightPuzzle with the current state and blankLocation
+        updated based on the provided move.
 
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
+        The move should be a string drawn from a list returned by legalMoves.
+        Illegal moves will raise an exception.
 
+        NOTE: This function *does not* change the current object.  Instead,
+        it returns a new object.
+        """
+        newPuzzle = copy.copy(self)
+        newPuzzle.packed, newPuzzle.blankLocation = self._slide(move)
+        newPuzzle._undo = []
         return newPuzzle
 
+    def push_move(self, move):
+        """
+          Like result, but changes this puzzle, so that pop_move can take
+        the move back (for the in-place searches).
+        """
+        self._undo.append((self.packed, self.blankLocation))
+        self.packed, self.blankLocation = self._slide(move)
+
+    def pop_move(self):
+        """
+          Takes back the last move of push_move.
+        """
+        self.packed, self.blankLocation = self._undo.pop()
+
     # Utilities for comparison and display
     def __eq__(self, other):
         """
@@ -150,27 +201,32 @@ class EightPuzzleState(search.SearchProblem):
               EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
           True
         """
-        for row in range(3):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        return self.size == other.size and self.packed == other.packed
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self.packed)
+
+    def key(self):
+        """
+          Returns the packed configuration, a compact stand-in for the
+          state in the search's predecessor maps.
+        """
+        return self.packed
 
     def __getAsciiString(self):
         """
           Returns a display string for the maze
         """
+        width = len(str(self.size * self.size - 1))
         lines = []
-        horizontalLine = ('-' * (13))
+        horizontalLine = ('-' * ((width + 3) * self.size + 1))
         lines.append(horizontalLine)
         for row in self.cells:
             rowLine = '|'
             for col in row:
                 if col == 0:
                     col = ' '
-                rowLine = rowLine + ' ' + col.__str__() + ' |'
+                rowLine = rowLine + ' ' + str(col).rjust(width) + ' |'
             lines.append(rowLine)
             lines.append(horizontalLine)
         return '\n'.join(lines)
@@ -191,9 +247,10 @@ class EightPuzzleSearchProblem(search.SearchProblem):
     def __init__(self, puzzle):
         "Creates a new EightPuzzleSearchProblem which stores search information."
         self.puzzle = puzzle
+        self.expanded = 0
 
     def get_start_state(self):
-        return puzzle
+        return self.puzzle
 
     def is_goal_state(self, state):
         return state.is_goal_state()
@@ -204,11 +261,25 @@ class EightPuzzleSearchProblem(search.SearchProblem):
           each succesor is either left, right, up, or down
           from the original state and the cost is 1.0 for each
         """
+        self.expanded += 1
         succ = []
         for a in state.legalMoves():
             succ.append((state.result(a), a, 1))
         return succ
 
+    def get_moves(self, state):
+        self.expanded += 1
+        return [(a, 1) for a in state.legalMoves()]
+
+    def get_successor(self, state, action):
+        return state.result(action)
+
+    def push_action(self, state, action):
+        state.push_move(action)
+
+    def pop_action(self, state):
+        state.pop_move()
+
     def get_cost_of_actions(self, actions):
         """
          actions: A list of actions to take
@@ -248,15 +319,16 @@ def loadEightPuzzle(puzzleNumber):
     return EightPuzzleState(EIGHT_PUZZLE_DATA[puzzleNumber])
 
 
-def createRandomEightPuzzle(moves=100):
+def createRandomEightPuzzle(moves=100, size=3):
     """
       moves: number of random moves to apply
+      size: the puzzle is size x size (4 for the fifteen puzzle)
 
       Creates a random eight puzzle by applying
       a series of 'moves' random moves to a solved
       puzzle.
     """
-    puzzle = EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8])
+    puzzle = EightPuzzleState(list(range(size * size)))
     for i in range(moves):
         # Execute a random legal move
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
@@ -0,0 +1,211 @@
+"""
+Breadth first search with its layers on disk, for problems whose frontier
+does not fit in memory.
+
+Only the layer being expanded is read (a state at a time), and the next one
+is written in sorted runs of fixed-size records (key, parent key) as it is
+generated. Once a layer is done, its runs are merged: duplicates within the
+layer, and states already in the previous layers, are dropped then (delayed
+duplicate detection). Each layer file stays sorted by key, so the parents
+of the goal are found by binary search in the layer files, and the plan is
+rebuilt from them.
+
+The states must have fixed-size bytes keys (state.key()), and the start
+state must rebuild the states from them (start_state.from_key(key)), as
+board.Board does.
+"""
+
+import heapq
+import os
+import shutil
+import tempfile
+
+# Records of the next layer sorted in memory before they are written as a run
+DEFAULT_RUN_SIZE = 1 << 16
+# Bytes read at a time from a layer or run file
+READ_SIZE = 1 << 20
+
+
+def read_records(path, width):
+    """
+    Yields the records of the file at path, width bytes each.
+    """
+    chunk = max(READ_SIZE // width, 1) * width
+    with open(path, 'rb') as records_file:
+        while True:
+            data = records_file.read(chunk)
+            if not data:
+                return
+            for offset in range(0, len(data), width):
+                yield data[offset:offset + width]
+
+
+def find_record(path, key, width):
+    """
+    Returns the record of the layer file at path starting with key, by binary
+    search, or None if there is none.
+    """
+    with open(path, 'rb') as records_file:
+        low, high = 0, os.path.getsize(path) // width
+        while low < high:
+            middle = (low + high) // 2
+            records_file.seek(middle * width)
+            record = records_file.read(width)
+            if record[:len(key)] < key:
+                low = middle + 1
+            elif record[:len(key)] > key:
+                high = middle
+            else:
+                return record
+    return None
+
+
+class ExternalLayers:
+    """
+    The layer files of a search in directory: layer d holds the sorted,
+    unique (key, parent key) records of the states first reached in d moves.
+    """
+
+    def __init__(self, directory, key_size, history=None):
+        self.directory = directory
+        self.key_size = key_size
+        self.width = 2 * key_size
+        self.history = history
+        self.depth = 0
+        self.sizes = []
+        self.runs = []
+        self.buffer = []
+
+    def layer_path(self, depth):
+        return os.path.join(self.directory, 'layer-%d.bin' % depth)
+
+    def write_start(self, key):
+        with open(self.layer_path(0), 'wb') as layer_file:
+            layer_file.write(key + key)
+        self.sizes.append(1)
+
+    def keys(self, depth):
+        """
+        Yields the keys of layer depth, in order.
+        """
+        for record in read_records(self.layer_path(depth), self.width):
+            yield record[:self.key_size]
+
+    def add(self, key, parent_key, run_size):
+        """
+        Adds a state of the next layer, spilling a run once run_size are held.
+        """
+        self.buffer.append(key + parent_key)
+        if len(self.buffer) >= run_size:
+            self.spill()
+
+    def spill(self):
+        if not self.buffer:
+            return
+        self.buffer.sort()
+        path = os.path.join(self.directory, 'run-%d-%d.bin' % (self.depth + 1, len(self.runs)))
+        with open(path, 'wb') as run_file:
+            run_file.write(b''.join(self.buffer))
+        self.runs.append(path)
+        self.buffer = []
+
+    def merge(self):
+        """
+        Merges the runs into the next layer file, dropping the states already
+        in it or in the previous layers (the last history of them, if given),
+        and returns the number of states in the new layer.
+        """
+        self.spill()
+        first = 0 if self.history is None else max(self.depth + 1 - self.history, 0)
+        # Old keys sort before new records with the same key, which they hide
+        old = [((key, 0) for key in self.keys(depth)) for depth in range(first, self.depth + 1)]
+        new = [((record[:self.key_size], 1, record) for record in read_records(run, self.width))
+               for run in self.runs]
+        self.depth += 1
+        size = 0
+        last_key = None
+        with open(self.layer_path(self.depth), 'wb') as layer_file:
+            for entry in heapq.merge(*old, *new):
+                if entry[0] == last_key:
+                    continue
+                last_key = entry[0]
+                if entry[1] == 1:
+                    layer_file.write(entry[2])
+                    size += 1
+        for run in self.runs:
+            os.remove(run)
+        self.runs = []
+        self.sizes.append(size)
+        return size
+
+    def parent(self, key, depth):
+        return find_record(self.layer_path(depth), key, self.width)[self.key_size:]
+
+
+def external_breadth_first_search(problem, spill_dir=None, run_size=DEFAULT_RUN_SIZE, history=None,
+                                  observer=None):
+    """
+    Search the shallowest nodes in the search tree first, like
+    breadth_first_search, with the layers in files under spill_dir (a
+    temporary directory by default), removed when the search returns.
+
+    Duplicates are checked against the layers of the last history depths
+    (all by default): 2 is enough when every action can be undone, and 0
+    when no state can be reached at two depths (like the blokus puzzles,
+    where each move uses up a piece). run_size bounds the number of records
+    held in memory.
+    """
+    start_state = problem.get_start_state()
+    start_key = start_state.key()
+    directory = tempfile.mkdtemp(prefix='bfs-', dir=spill_dir)
+    try:
+        layers = ExternalLayers(directory, len(start_key), history)
+        layers.write_start(start_key)
+        closed_size = 1
+        while layers.sizes[-1]:
+            fringe_size = layers.sizes[-1]
+            for key in layers.keys(layers.depth):
+                current = start_state.from_key(key)
+                if problem.is_goal_state(current):
+                    if observer is not None:
+                        observer.on_goal(current)
+                    return rebuild_actions(problem, start_state, layers, key)
+                fringe_size -= 1
+                if observer is not None:
+                    observer.on_expand(current, fringe_size, closed_size)
+                for state, action, cost in problem.get_successors(current):
+                    layers.add(state.key(), key, run_size)
+                    if observer is not None:
+                        observer.on_generate(state, action)
+            closed_size += layers.merge()
+        return list()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def rebuild_actions(problem, start_state, layers, goal_key):
+    """
+    Returns the actions leading to the state with goal_key in the deepest
+    layer, following the parent keys back to the start: the action between
+    a parent and its child is the one of the parent's successors with the
+    child's key.
+    """
+    # Regenerating the parents does not count as expanding them
+    counts = {name: getattr(problem, name) for name in ('expanded', 'generated') if hasattr(problem, name)}
+    actions = list()
+    key = goal_key
+    for depth in range(layers.depth, 0, -1):
+        parent_key = layers.parent(key, depth)
+        for state, action, cost in problem.get_successors(start_state.from_key(parent_key)):
+            if state.key() == key:
+                actions.append(action)
+                break
+        key = parent_key
+    for name, count in counts.items():
+        setattr(problem, name, count)
+    actions.reverse()
+    return actions
+
+
+# Abbreviations
+external_bfs = external_breadth_first_search
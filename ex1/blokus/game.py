@@ -1,11 +1,18 @@
 from inputs import RandomInput
 from pieces import PieceList
 from blokus_problems import *
+from bitboard import BitBoard
 from search import astar
+import parallel_search
+import symmetry
+import solution_cache
+import external_search
+import search_profile
+import registry
 from displays import GuiDisplay
-import sys
-import os
 import ast
+import json
+import functools
 
 
 class GameEngine(object):
@@ -14,8 +21,10 @@ class GameEngine(object):
     get input/draw output
     """
 
-    def __init__(self, inputs, width, height, piece_list):
-        self.display = GuiDisplay(width, height, title='Intro to AI -- 67842 -- Ex1')
+    def __init__(self, inputs, width, height, piece_list, display=None):
+        if display is None:
+            display = GuiDisplay(width, height, title='Intro to AI -- 67842 -- Ex1')
+        self.display = display
         self.inputs = inputs
 
         self.piece_list = piece_list
@@ -79,14 +88,14 @@ class GameEngine(object):
         for p in range(self.num_players):
             print("Player %d: %d pts" % (p + 1, self.score[p]))
 
-    def play_game(self):
+    def play_game(self, verbose=True):
         if len(self.inputs) != 4:
-            print("Error: Need 4 players for a game. ")
-            sys.exit(1)
+            raise ValueError("Error: Need 4 players for a game. ")
         while not self.all_players_passed():
             self.play_turn()
 
-        self._print_scores()
+        if verbose:
+            self._print_scores()
         return self.score
 
 
@@ -107,8 +116,8 @@ def play_simple_search(problem, search_func):
     print("Expanded nodes: %d, score: %d" % (problem.expanded, board.score(0)))
 
 
-def play_a_star_search(problem, heuristic):
-    back_trace = astar(problem, heuristic)
+def play_a_star_search(problem, heuristic, search_func=astar):
+    back_trace = search_func(problem, heuristic)
     display = GuiDisplay(problem.board.board_w, problem.board.board_h, title='Intro to AI -- 67842 -- Ex1')
     board = problem.get_start_state()
 
@@ -126,37 +135,21 @@ def play_a_star_search(problem, heuristic):
     print("Expanded nodes: %d, score: %d" % (problem.expanded, board.score(0)))
 
 
-def play_approximate_search(problem):
-    back_trace = problem.solve()
+def play_approximate_search(problem, search_func=None):
+    back_trace = search_func(problem) if search_func is not None else problem.solve()
     display = GuiDisplay(problem.board.board_w, problem.board.board_h, title='Intro to AI -- 67842 -- Ex1')
     board = problem.get_start_state()
     for action in back_trace:
         board.add_move(0, action)
         display.draw_board(board, dots=problem.targets)
+    for seconds, cost, expanded in problem.improvements:
+        print("%.2fs: plan of cost %d after %d expanded nodes" % (seconds, cost, expanded))
     print("Expanded nodes: %d, score: %d" % (problem.expanded, board.score(0)))
 
 
 def load_heuristic(heuristic_name):
-    # Looks through all pythonPath Directories for the right function
-    python_path_str = os.path.expandvars("$PYTHONPATH")
-    if python_path_str.find(';') == -1:
-        python_path_dirs = python_path_str.split(':')
-    else:
-        python_path_dirs = python_path_str.split(';')
-    python_path_dirs.append('.')
-
-    for moduleDir in python_path_dirs:
-        if not os.path.isdir(moduleDir):
-            continue
-        module_names = [f for f in os.listdir(moduleDir) if os.path.isfile(f)]
-        for module_name in module_names:
-            try:
-                module = __import__(str(module_name[:-3]))
-            except ImportError:
-                continue
-            if heuristic_name in dir(module):
-                return getattr(module, heuristic_name)
-    raise Exception('The function ' + heuristic_name + ' was not found.')
+    # Imports only the module the registry names for the heuristic
+    return registry.resolve(heuristic_name, registry.HEURISTICS)
 
 
 def main():
@@ -170,6 +163,10 @@ def main():
                   - starts a game between 4 random agents
                (2) python game.py -p tiny_set.txt -s 4 7
                OR  python game.py -s 14 14 -f ucs -z cover [(1, 1), (5, 9), (9, 6)]
+               (3) python game.py -g 1000 -w 8 -o games.jsonl
+                  - plays 1000 seeded games between 4 random agents in 8 processes
+               (4) python game.py -p tiny_set.txt -s 6 6 -f bfs -d /tmp
+                  - solves the fill puzzle with the bfs layers on disk
     """
     parser = OptionParser(usage_str)
 
@@ -181,7 +178,9 @@ def main():
     parser.add_option('-f', '--search-function', dest='search_func',
                       metavar='FUNC', help='search function to use. This option is ignored for sub-optimal search. ',
                       type='choice',
-                      choices=['dfs', 'bfs', 'ucs', 'astar'], default='dfs')
+                      choices=['dfs', 'bfs', 'ucs', 'astar', 'dfs_in_place', 'idastar', 'smastar',
+                               'hdastar'],
+                      default='dfs')
     parser.add_option('-H', '--heuristic', dest='h_func',
                       help='heuristic function to use for A* search. \
                       This option is ignored for other search functions. ',
@@ -191,6 +190,39 @@ def main():
                       choices=['fill', 'diagonal', 'corners', 'cover', 'sub-optimal', 'mini-contest'], default=None)
     parser.add_option('-x', '--start-point', dest='start', type='int', nargs=2,
                       help='starting point', default=(0, 0))
+    parser.add_option('-b', '--board', dest='board',
+                      help='the board representation to use', type='choice',
+                      choices=['array', 'bitboard'], default='array')
+    parser.add_option('-t', '--track-moves', dest='track_moves', action='store_true',
+                      help='keep the legal moves of array boards up to date instead of \
+                      regenerating them for every board', default=False)
+    parser.add_option('-m', '--max-nodes', dest='max_nodes', type='int',
+                      help='the number of nodes smastar may keep in memory', default=None)
+    parser.add_option('-M', '--max-bytes', dest='max_bytes', type='int',
+                      help='the approximate number of bytes of nodes (states and bookkeeping) smastar \
+                      may keep in memory (ignored if --max-nodes is given)', default=None)
+    parser.add_option('-l', '--lazy', dest='lazy', action='store_true',
+                      help='build successors only when they are popped (bfs, ucs and astar)', default=False)
+    parser.add_option('-w', '--workers', dest='workers', type='int',
+                      help='the number of processes hdastar runs (default: one per CPU)', default=None)
+    parser.add_option('-y', '--symmetry', dest='symmetry', action='store_true',
+                      help='treat mirror images and rotations of a board as the same state, under the \
+                      symmetries the puzzle allows (dfs and bfs only)', default=False)
+    parser.add_option('-g', '--games', dest='games', type='int',
+                      help='play this many seeded games without a display, in -w processes', default=None)
+    parser.add_option('--seed', dest='seed', type='int',
+                      help='the seed of the first of the --games games', default=0)
+    parser.add_option('-o', '--output', dest='output',
+                      help='the file --games writes the result of each game to (JSON lines)', default=None)
+    parser.add_option('-C', '--cache', dest='cache', metavar='FILE',
+                      help='answer puzzles from (and store their solutions in) this solution cache', default=None)
+    parser.add_option('-d', '--spill-dir', dest='spill_dir', metavar='DIR',
+                      help='run bfs with its layers on disk, in this directory', default=None)
+    parser.add_option('-P', '--profile', dest='profile', metavar='FILE',
+                      help='profile the search, print the report and write it to this file as JSON', default=None)
+    parser.add_option('-T', '--time-limit', dest='time_limit', type='float',
+                      help='the number of seconds sub-optimal and mini-contest searches may take',
+                      default=SUBOPTIMAL_TIME_LIMIT)
 
     options, cover_points = parser.parse_args()
     if (options.puzzle == 'cover' or options.puzzle == 'sub-optimal') and len(cover_points) == 0:
@@ -201,32 +233,119 @@ def main():
 
     piece_list = PieceList(options.pieces_file)
 
-    if options.puzzle is None:
+    def cached(problem, search_func, search_name, heuristic_name=None, parameters=None):
+        """
+        Wraps search_func with the solution cache, if one was given. parameters
+        are the options the plan depends on besides the puzzle and the search
+        """
+        if options.cache is None:
+            return search_func
+        digest = solution_cache.problem_digest(options.puzzle, options.size[1], options.size[0], piece_list,
+                                               options.start, getattr(problem, 'targets', []), search_name,
+                                               heuristic_name, parameters)
+        return solution_cache.SolutionCache(options.cache).cached(search_func, digest)
+
+    def profiled(search_func):
+        """
+        Wraps search_func with a profiler, if a profile was asked for
+        """
+        if options.profile is None:
+            return search_func
+
+        def profiled_search(problem, *args):
+            profiler = search_profile.SearchProfiler()
+            actions = profiler.run(search_func, problem, *args)
+            print(profiler.format_report())
+            profiler.write_json(options.profile)
+            return actions
+        return profiled_search
+
+    if options.puzzle is None and options.games is not None:
+        import batch_games
+        summary = batch_games.run_batch(options.games, options.seed, options.workers, options.output,
+                                        board_w=options.size[1], board_h=options.size[0],
+                                        pieces_file=options.pieces_file, board=options.board,
+                                        track_moves=options.track_moves)
+        print(json.dumps(summary, indent=2))
+
+    elif options.puzzle is None:
         inputs = [RandomInput() for _ in range(4)]
         engine = GameEngine(inputs, options.size[1], options.size[0], piece_list)
+        if options.board == 'bitboard':
+            engine.board = BitBoard.from_board(engine.board)
+        elif options.track_moves:
+            engine.board.track_legal_moves()
         engine.play_game()
 
     elif options.puzzle == 'sub-optimal':
-        problem = ClosestLocationSearch(options.size[1], options.size[0], piece_list, options.start, targets)
-        play_approximate_search(problem)
+        problem = ClosestLocationSearch(options.size[1], options.size[0], piece_list, options.start, targets,
+                                        options.time_limit)
+        if options.board == 'bitboard':
+            problem.board = BitBoard.from_board(problem.board)
+        elif options.track_moves:
+            problem.board.track_legal_moves()
+        play_approximate_search(problem, cached(problem, lambda problem: problem.solve(), options.puzzle,
+                                                parameters={'time_limit': options.time_limit}))
 
     elif options.puzzle == 'mini-contest':
-        problem = MiniContestSearch(options.size[1], options.size[0], piece_list, options.start, targets)
-        play_approximate_search(problem)
-
-    elif options.search_func in ['dfs', 'bfs', 'ucs', 'astar']:
+        problem = MiniContestSearch(options.size[1], options.size[0], piece_list, options.start, targets,
+                                    options.time_limit)
+        if options.board == 'bitboard':
+            problem.board = BitBoard.from_board(problem.board)
+        elif options.track_moves:
+            problem.board.track_legal_moves()
+        play_approximate_search(problem, cached(problem, lambda problem: problem.solve(), options.puzzle,
+                                                parameters={'time_limit': options.time_limit}))
+
+    elif options.search_func in ['dfs', 'bfs', 'ucs', 'astar', 'dfs_in_place', 'idastar', 'smastar',
+                                 'hdastar']:
         if options.puzzle == 'fill':
             problem = BlokusFillProblem(options.size[1], options.size[0], piece_list, options.start)
         elif options.puzzle == 'corners':
             problem = BlokusCornersProblem(options.size[1], options.size[0], piece_list, options.start)
         elif options.puzzle == 'cover':
             problem = BlokusCoverProblem(options.size[1], options.size[0], piece_list, options.start, targets)
-
-        if options.search_func in ['dfs', 'bfs', 'ucs']:
-            search = __import__('search')
-            play_simple_search(problem, getattr(search, options.search_func))
-        elif options.search_func == 'astar':
-            play_a_star_search(problem, load_heuristic(options.h_func))
+        if options.board == 'bitboard':
+            problem.board = BitBoard.from_board(problem.board)
+        elif options.track_moves:
+            problem.board.track_legal_moves()
+
+        search = __import__('search')
+        if options.lazy and options.search_func in ['bfs', 'ucs', 'astar']:
+            options.search_func += '_lazy'
+        # The searches that find duplicates by state_key
+        keyed = {}
+        if options.symmetry:
+            # The other searches move a key to a cheaper path, which may reach a
+            # mirror image of the board its successors were generated from
+            if options.search_func not in ['dfs', 'bfs', 'bfs_lazy']:
+                raise Exception('only dfs and bfs can treat symmetric boards as the same state')
+            keyed['state_key'] = symmetry.canonical_key(problem)
+        if options.spill_dir is not None:
+            if options.search_func != 'bfs' or options.board == 'bitboard':
+                raise Exception('only bfs on array boards can spill to disk')
+            play_simple_search(problem, cached(problem, profiled(functools.partial(
+                external_search.external_bfs, spill_dir=options.spill_dir)), options.search_func))
+        elif options.search_func in ['dfs', 'bfs', 'ucs', 'dfs_in_place', 'bfs_lazy', 'ucs_lazy']:
+            play_simple_search(problem, cached(problem, profiled(functools.partial(
+                getattr(search, options.search_func), **keyed)), options.search_func))
+        elif options.search_func in ['astar', 'idastar', 'astar_lazy']:
+            play_a_star_search(problem, load_heuristic(options.h_func),
+                               cached(problem, profiled(functools.partial(getattr(search, options.search_func),
+                                                                          **keyed)),
+                                      options.search_func, options.h_func))
+        elif options.search_func == 'smastar':
+            play_a_star_search(problem, load_heuristic(options.h_func),
+                               cached(problem, profiled(functools.partial(search.smastar,
+                                                                          max_nodes=options.max_nodes,
+                                                                          max_bytes=options.max_bytes)),
+                                      options.search_func, options.h_func,
+                                      {'max_nodes': options.max_nodes, 'max_bytes': options.max_bytes}))
+        elif options.search_func == 'hdastar':
+            play_a_star_search(problem, load_heuristic(options.h_func),
+                               cached(problem, functools.partial(parallel_search.hdastar,
+                                                                 num_workers=options.workers, **keyed),
+                                      options.search_func, options.h_func))
     else:
         raise Exception('unrecognized options')
 
@@ -32,10 +32,5 @@ class RandomInput(Input):
     """
 
     def get_move(self, player, board):
-        import random
-
-        move_list = board.get_legal_moves(player)
-        if move_list:
-            return move_list[random.randint(0, len(move_list) - 1)]
-        # else
-        return None
+        # Uniform over the legal moves, without listing them all
+        return board.sample_legal_move(player)
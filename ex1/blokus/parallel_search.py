@@ -0,0 +1,267 @@
+"""
+Hash distributed A* (HDA*): A* spread over worker processes.
+
+Every state is owned by one worker, chosen by a hash of its key. A worker
+keeps the open and closed lists of the states it owns, expands its best open
+node and sends each successor (in batches) to the successor's owner. The main
+process keeps the best solution found so far (the incumbent) and stops the
+workers once no open node anywhere can lead to a cheaper one.
+
+States that can be rebuilt from their keys (state.key() and
+start_state.from_key(key), as board.Board does) are sent as their keys and
+rebuilt by their owner, like external_search does with its layers; other
+states are sent whole.
+"""
+
+import heapq
+import multiprocessing
+import os
+import pickle
+import queue
+import time
+import zlib
+
+from search import default_state_key, null_heuristic
+
+
+def owner_of(key, num_workers):
+    """
+    Returns the index of the worker owning the state with <key>. Unlike
+    hash(), this is the same in every process.
+    """
+    if not isinstance(key, bytes):
+        key = pickle.dumps(key)
+    return zlib.crc32(key) % num_workers
+
+
+def rebuilds_from_keys(state):
+    """
+    Whether the states of a search starting at <state> are sent as their keys.
+    """
+    return hasattr(state, 'key') and hasattr(state, 'from_key')
+
+
+class HDAWorker:
+    """
+    One HDA* worker: the open and closed lists of the states it owns.
+
+    Messages read from its inbox:
+    - ('nodes', [(state, cost, parent_key, action), ...]): states to consider
+      (state is state.key() if rebuilds_from_keys)
+    - ('incumbent', cost): the cost of the best solution found so far
+    - ('probe', round): report ('status', ...) for termination detection
+    - ('parent', key): report ('parent', key, parent_key, action)
+    - ('stop',): report ('expanded', count) and exit
+    """
+
+    def __init__(self, index, problem, heuristic, state_key, inboxes, outbox, batch_size):
+        self.index = index
+        self.problem = problem
+        self.heuristic = heuristic
+        self.state_key = state_key
+        self.inboxes = inboxes
+        self.outbox = outbox
+        self.batch_size = batch_size
+        start_state = problem.get_start_state()
+        self.start_state = start_state if rebuilds_from_keys(start_state) else None
+
+        # Open list: heap of (f, h, counter, cost, key); states of open nodes by key
+        self.fringe = []
+        self.open_states = {}
+        self.counter = 0
+        # Closed list: key -> (cost, parent_key, action), for open nodes too
+        self.costs = {}
+        self.incumbent = float('inf')
+        self.outgoing = [[] for _ in inboxes]
+        self.sent = 0
+        self.received = 0
+
+    def run(self):
+        inbox = self.inboxes[self.index]
+        running = True
+        while running:
+            # Block only if there is nothing to expand
+            block = not self.fringe
+            while True:
+                try:
+                    message = inbox.get(timeout=0.05) if block else inbox.get_nowait()
+                except queue.Empty:
+                    break
+                block = False
+                running = self.handle(message)
+                if not running:
+                    break
+            if running and self.fringe:
+                self.expand()
+        for box in self.inboxes:
+            box.cancel_join_thread()
+
+    def handle(self, message):
+        """
+        Handle one message; returns False once the worker has to stop.
+        """
+        tag = message[0]
+        if tag == 'nodes':
+            self.received += 1
+            for state, cost, parent_key, action in message[1]:
+                if self.start_state is not None:
+                    state = self.start_state.from_key(state)
+                self.consider(state, cost, parent_key, action)
+        elif tag == 'incumbent':
+            self.incumbent = min(self.incumbent, message[1])
+        elif tag == 'probe':
+            self.flush()
+            min_f = self.fringe[0][0] if self.fringe else float('inf')
+            self.outbox.put(('status', self.index, message[1], self.sent, self.received, min_f))
+        elif tag == 'parent':
+            cost, parent_key, action = self.costs[message[1]]
+            self.outbox.put(('parent', message[1], parent_key, action))
+        elif tag == 'stop':
+            self.outbox.put(('expanded', self.problem.expanded))
+            return False
+        return True
+
+    def consider(self, state, cost, parent_key, action):
+        """
+        Open <state> if it is new or reached more cheaply than before.
+        """
+        key = self.state_key(state)
+        if key in self.costs and self.costs[key][0] <= cost:
+            return
+        h = self.heuristic(state, self.problem)
+        if cost + h >= self.incumbent:
+            return
+        self.costs[key] = (cost, parent_key, action)
+        self.open_states[key] = state
+        heapq.heappush(self.fringe, (cost + h, h, self.counter, cost, key))
+        self.counter += 1
+
+    def expand(self):
+        f, h, counter, cost, key = heapq.heappop(self.fringe)
+        state = self.open_states.get(key)
+        if state is None or self.costs[key][0] != cost:
+            # Stale entry: the state was reopened with a lower cost
+            return
+        del self.open_states[key]
+        if f >= self.incumbent:
+            return
+        if self.problem.is_goal_state(state):
+            self.incumbent = cost
+            self.outbox.put(('goal', cost, key))
+            return
+        for successor, action, step_cost in self.problem.get_successors(state):
+            owner = owner_of(self.state_key(successor), len(self.inboxes))
+            if owner == self.index:
+                self.consider(successor, cost + step_cost, key, action)
+            else:
+                if self.start_state is not None:
+                    successor = successor.key()
+                self.outgoing[owner].append((successor, cost + step_cost, key, action))
+                if len(self.outgoing[owner]) >= self.batch_size:
+                    self.send(owner)
+        if not self.fringe:
+            self.flush()
+
+    def send(self, owner):
+        self.inboxes[owner].put(('nodes', self.outgoing[owner]))
+        self.outgoing[owner] = []
+        self.sent += 1
+
+    def flush(self):
+        for owner, batch in enumerate(self.outgoing):
+            if batch:
+                self.send(owner)
+
+
+def run_worker(*args):
+    HDAWorker(*args).run()
+
+
+def hda_star_search(problem, heuristic=null_heuristic, num_workers=None,
+                    state_key=default_state_key, batch_size=32):
+    """
+    Search the node that has the lowest combined cost and heuristic first,
+    with num_workers processes (one per CPU by default).
+
+    The problem, its states, the heuristic and state_key must be picklable,
+    and state_key(state) must be the same for equal states in every process.
+    The search stops once the cheapest solution found costs no more than the
+    lowest f of every open node and no batch of nodes is in flight; with an
+    admissible heuristic the solution is then optimal.
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    inboxes = [multiprocessing.Queue() for _ in range(num_workers)]
+    outbox = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=run_worker,
+                                       args=(i, problem, heuristic, state_key, inboxes, outbox,
+                                             batch_size))
+               for i in range(num_workers)]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    start_state = problem.get_start_state()
+    start_node = start_state.key() if rebuilds_from_keys(start_state) else start_state
+    inboxes[owner_of(state_key(start_state), num_workers)].put(('nodes', [(start_node, 0, None, None)]))
+    # Batches sent by this process (the start state), for the message count
+    sent = 1
+
+    incumbent = float('inf')
+    goal_key = None
+    probe_round = 0
+    previous_counts = None
+    while True:
+        for box in inboxes:
+            box.put(('probe', probe_round))
+        statuses = {}
+        while len(statuses) < num_workers:
+            message = outbox.get()
+            if message[0] == 'goal' and message[1] < incumbent:
+                incumbent, goal_key = message[1], message[2]
+                for box in inboxes:
+                    box.put(('incumbent', incumbent))
+            elif message[0] == 'status' and message[2] == probe_round:
+                statuses[message[1]] = message[3:]
+        total_sent = sent + sum(status[0] for status in statuses.values())
+        total_received = sum(status[1] for status in statuses.values())
+        min_f = min(status[2] for status in statuses.values())
+        # Two rounds in a row with the same counts and no message in flight
+        # mean no worker received anything in between (four counter method)
+        if total_sent == total_received and min_f >= incumbent:
+            if previous_counts == (total_sent, total_received):
+                break
+            previous_counts = (total_sent, total_received)
+        else:
+            previous_counts = None
+        probe_round += 1
+        time.sleep(0.01)
+
+    actions = list()
+    key = goal_key
+    while key is not None:
+        inboxes[owner_of(key, num_workers)].put(('parent', key))
+        while True:
+            message = outbox.get()
+            if message[0] == 'parent' and message[1] == key:
+                break
+        key, action = message[2], message[3]
+        if key is not None:
+            actions.append(action)
+    actions.reverse()
+
+    for box in inboxes:
+        box.put(('stop',))
+    stopped = 0
+    while stopped < num_workers:
+        message = outbox.get()
+        if message[0] == 'expanded':
+            problem.expanded += message[1]
+            stopped += 1
+    for worker in workers:
+        worker.join()
+    return actions
+
+
+# Abbreviations
+hdastar = hda_star_search
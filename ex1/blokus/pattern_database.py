@@ -0,0 +1,193 @@
+"""
+Additive disjoint pattern databases for the N x N sliding puzzles of
+eightpuzzle.py.
+
+A pattern is a set of the puzzle's numbers. Its database holds, for every
+placement of those numbers, the least number of moves of those numbers that
+brings them home, whatever the other numbers do. It is built by a retrograde
+breadth first search from the goal over abstract states (the cells of the
+pattern's numbers and of the blank), where moving any other number costs
+nothing. No move counts for two disjoint patterns, so the sum of their
+databases is an admissible heuristic.
+
+The databases are saved as .npy byte arrays and memory-mapped when loaded,
+so each is built once:
+
+    python pattern_database.py -n 4 -d pdb
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from eightpuzzle import tile_bits
+
+# Disjoint patterns of the eight and fifteen puzzles, numbers that are close
+# to each other in the goal
+DEFAULT_PATTERNS = {
+    3: ((1, 2, 4, 5), (3, 6, 7, 8)),
+    4: ((1, 2, 3, 6, 7), (4, 5, 8, 9, 12), (10, 11, 13, 14, 15)),
+}
+# Where the heuristics look for the databases unless told otherwise
+DEFAULT_PDB_DIR = 'pdb'
+# The distance of the placements the search never reached
+UNREACHED = 255
+
+
+def pattern_path(size, pattern, directory):
+    return os.path.join(directory, 'pdb-%dx%d-%s.npy' % (size, size, '-'.join(str(n) for n in pattern)))
+
+
+def abstract_moves(indices, size, bits, num_numbers):
+    """
+    Returns the abstract states one move away from each of indices, as two
+    arrays: the moves of the blank onto a cell outside the pattern (free)
+    and onto a number of the pattern, which takes the blank's cell (pushed).
+
+    An abstract state is the cell of the blank in the lowest bits, then the
+    cell of each number of the pattern, bits each.
+    """
+    field = (1 << bits) - 1
+    shifts = bits * np.arange(1, num_numbers + 1, dtype=np.int64)
+    blank = indices & field
+    row, col = blank // size, blank % size
+    cells = (indices[:, None] >> shifts) & field
+    free, pushed = [], []
+    for delta, legal in ((-size, row > 0), (size, row < size - 1), (-1, col > 0), (1, col < size - 1)):
+        before = blank[legal]
+        after = before + delta
+        hit = cells[legal] == after[:, None]
+        moved = hit.any(axis=1)
+        indices_after = indices[legal] - before + after
+        free.append(indices_after[~moved])
+        # The number on the blank's new cell goes to its old cell
+        numbers_after = indices_after + (hit * ((before - after)[:, None] << shifts)).sum(axis=1)
+        pushed.append(numbers_after[moved])
+    return np.concatenate(free), np.concatenate(pushed)
+
+
+def build_pattern_database(size, pattern):
+    """
+    Returns the database of pattern for the size x size puzzle: a uint8 array
+    of the moves of the pattern's numbers needed to bring them home, indexed
+    by their cells (see PatternDatabaseHeuristic.pattern_index).
+    """
+    bits = tile_bits(size)
+    distances = np.full(1 << (bits * (len(pattern) + 1)), UNREACHED, np.uint8)
+    # The goal: the blank in cell 0 and number n in cell n
+    start = sum(number << (bits * (j + 1)) for j, number in enumerate(pattern))
+    distances[start] = 0
+    frontier = np.array([start], np.int64)
+    distance = 0
+    while len(frontier):
+        # The free moves of the layer keep its distance, so close it under them first
+        layer = [frontier]
+        while len(layer[-1]):
+            free, _ = abstract_moves(layer[-1], size, bits, len(pattern))
+            free = np.unique(free)
+            free = free[distances[free] == UNREACHED]
+            distances[free] = distance
+            layer.append(free)
+        _, pushed = abstract_moves(np.concatenate(layer), size, bits, len(pattern))
+        pushed = np.unique(pushed)
+        pushed = pushed[distances[pushed] == UNREACHED]
+        distance += 1
+        distances[pushed] = distance
+        frontier = pushed
+    # Wherever the blank is
+    return distances.reshape(-1, 1 << bits).min(axis=1)
+
+
+def load_pattern_database(size, pattern, directory=DEFAULT_PDB_DIR, rebuild=False):
+    """
+    Returns the database of pattern memory-mapped from its file in directory,
+    building and saving it first if there is none (or if rebuild is set).
+    A directory of None keeps it in memory only.
+    """
+    if directory is None:
+        return build_pattern_database(size, pattern)
+    path = pattern_path(size, pattern, directory)
+    if rebuild or not os.path.exists(path):
+        table = build_pattern_database(size, pattern)
+        os.makedirs(directory, exist_ok=True)
+        # Written under a temporary name, so readers never see half a file
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.npy')
+        with os.fdopen(handle, 'wb') as temp_file:
+            np.save(temp_file, table)
+        os.replace(temp_path, path)
+    return np.load(path, mmap_mode='r')
+
+
+class PatternDatabaseHeuristic:
+    """
+    The sum of the databases of disjoint patterns of the size x size puzzle,
+    as a heuristic(state, problem) for A* and IDA* on EightPuzzleSearchProblem.
+    """
+
+    def __init__(self, size, patterns=None, directory=DEFAULT_PDB_DIR):
+        if patterns is None:
+            patterns = DEFAULT_PATTERNS[size]
+        numbers = [number for pattern in patterns for number in pattern]
+        if len(set(numbers)) != len(numbers) or not all(0 < number < size * size for number in numbers):
+            raise Exception('patterns must be disjoint sets of the numbers 1 to %d' % (size * size - 1))
+        self.size = size
+        self.bits = tile_bits(size)
+        self.patterns = [tuple(pattern) for pattern in patterns]
+        self.tables = [load_pattern_database(size, pattern, directory) for pattern in self.patterns]
+
+    def pattern_index(self, cells, pattern):
+        """
+        The index of the database of pattern for the cells of the numbers
+        (cells[n] is the cell of number n).
+        """
+        index = 0
+        for j, number in enumerate(pattern):
+            index |= cells[number] << (self.bits * j)
+        return index
+
+    def __call__(self, state, problem=None):
+        mask = (1 << self.bits) - 1
+        packed = state.packed
+        cells = [0] * (self.size * self.size)
+        for cell in range(self.size * self.size):
+            cells[(packed >> (cell * self.bits)) & mask] = cell
+        return sum(int(table[self.pattern_index(cells, pattern)])
+                   for pattern, table in zip(self.patterns, self.tables))
+
+
+def main():
+    from optparse import OptionParser
+    usage_str = """
+    USAGE:      python pattern_database.py <options>
+    EXAMPLES:   python pattern_database.py -n 4 -d pdb
+                  - builds the default 5-5-5 databases of the fifteen puzzle
+                python pattern_database.py -n 4 -p 1,2,3,4 -p 5,6,7,8
+                  - builds the databases of the given patterns
+    """
+    parser = OptionParser(usage_str)
+    parser.add_option('-n', '--size', dest='size', type='int',
+                      help='the puzzle is size x size (3 for the eight puzzle)', default=3)
+    parser.add_option('-p', '--pattern', dest='patterns', action='append',
+                      help='the comma-separated numbers of a pattern (may be repeated)', default=None)
+    parser.add_option('-d', '--directory', dest='directory',
+                      help='the directory to save the databases in', default=DEFAULT_PDB_DIR)
+    parser.add_option('-f', '--force', dest='force', action='store_true',
+                      help='build the databases again even if they are saved', default=False)
+    options, args = parser.parse_args()
+
+    if options.patterns is None:
+        patterns = DEFAULT_PATTERNS[options.size]
+    else:
+        patterns = [tuple(int(number) for number in pattern.split(',')) for pattern in options.patterns]
+    for pattern in patterns:
+        start_time = time.time()
+        table = load_pattern_database(options.size, pattern, options.directory, options.force)
+        reached = table[table != UNREACHED]
+        print('%s: %d entries, max %d moves, %.1fs' % (pattern_path(options.size, pattern, options.directory),
+                                                       len(reached), reached.max(), time.time() - start_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -118,6 +118,22 @@ class Piece(object):
         return self.orientations.__hash__()
 
 
+class PackedOrientation(object):
+    """
+    One orientation of a piece, packed for fast checks:
+    - orientation: the orientation itself (a frozenset of (x, y) tiles)
+    - index: its position in the iteration order of the piece
+    - width/height: its bounding box
+    """
+    __slots__ = ('orientation', 'index', 'width', 'height')
+
+    def __init__(self, orientation, index):
+        self.orientation = orientation
+        self.index = index
+        self.width = max(x for (x, y) in orientation) + 1
+        self.height = max(y for (x, y) in orientation) + 1
+
+
 class PieceList(object):
     """
     The PieceList class stores a list of all of the Blokus game pieces (the
@@ -173,6 +189,19 @@ class PieceList(object):
                 self.pieces.append(Piece(x_list, y_list))
 
                 line_index += 1 + num_lines
+        self.pack()
+
+    def pack(self):
+        """
+        Build the packed form of the pieces, shared by every board using this
+        list: packed[n] lists a PackedOrientation for each orientation of
+        piece n (in the iteration order of the piece), and packed_index[n]
+        maps each orientation of piece n to its PackedOrientation.
+        """
+        self.packed = [[PackedOrientation(ori, index) for index, ori in enumerate(piece)]
+                       for piece in self.pieces]
+        self.packed_index = [{packed.orientation: packed for packed in orientations}
+                             for orientations in self.packed]
 
     def get_num_pieces(self):
         """
@@ -195,4 +224,5 @@ class PieceList(object):
     def copy(self):
         cpy_p_list = PieceList(None)
         cpy_p_list.pieces = [piece.copy() for piece in self.pieces]
+        cpy_p_list.pack()
         return cpy_p_list
@@ -0,0 +1,112 @@
+"""
+Lookup of the heuristics and agents named on the command line.
+
+Each registry maps a name to a "module:attribute" string, and resolve
+imports only the module of the requested name. Names missing from the
+registries are looked up in an optional index file, built once by reading
+(not importing) the sources of a set of directories:
+
+    python registry.py -o registry_index.json . PCF
+"""
+
+import ast
+import importlib
+import json
+import os
+
+# The heuristics game.py -H can name
+HEURISTICS = {
+    'null_heuristic': 'search:null_heuristic',
+    'blokus_corners_heuristic': 'blokus_problems:blokus_corners_heuristic',
+    'blokus_cover_heuristic': 'blokus_problems:blokus_cover_heuristic',
+    'suboptimal_heuristic': 'blokus_problems:suboptimal_heuristic',
+}
+
+# The agents pacman.py -p and -g can name
+AGENTS = {
+    'GoWestAgent': 'PCF.searchAgents:GoWestAgent',
+    'SearchAgent': 'PCF.searchAgents:SearchAgent',
+    'StayEastSearchAgent': 'PCF.searchAgents:StayEastSearchAgent',
+    'StayWestSearchAgent': 'PCF.searchAgents:StayWestSearchAgent',
+    'AStarCornersAgent': 'PCF.searchAgents:AStarCornersAgent',
+    'AStarFoodSearchAgent': 'PCF.searchAgents:AStarFoodSearchAgent',
+    'ClosestDotSearchAgent': 'PCF.searchAgents:ClosestDotSearchAgent',
+    'ApproximateSearchAgent': 'PCF.searchAgents:ApproximateSearchAgent',
+    'LeftTurnAgent': 'PCF.pacmanAgents:LeftTurnAgent',
+    'GreedyAgent': 'PCF.pacmanAgents:GreedyAgent',
+    'RandomGhost': 'PCF.ghostAgents:RandomGhost',
+    'DirectionalGhost': 'PCF.ghostAgents:DirectionalGhost',
+}
+
+# The index resolve falls back on, if it exists
+DEFAULT_INDEX_PATH = 'registry_index.json'
+
+
+def load_index(path):
+    """
+    Returns the name -> "module:attribute" index stored at path, or an empty
+    one if there is no such file.
+    """
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path) as index_file:
+        return json.load(index_file)
+
+
+def resolve(name, registry, index_path=DEFAULT_INDEX_PATH):
+    """
+    Returns the object registered as name, importing its module only. Names
+    the registry does not know are looked up in the index at index_path.
+    """
+    spec = registry.get(name)
+    if spec is None:
+        spec = load_index(index_path).get(name)
+    if spec is None:
+        raise Exception('The name ' + name + ' was not found.')
+    module_name, attribute = spec.split(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def build_index(directories, path=DEFAULT_INDEX_PATH):
+    """
+    Indexes the top-level functions and classes of the modules in
+    directories (as packages when the directory is not '.'), from their
+    sources, and writes the index to path. Returns the index; names defined
+    by several modules keep the first one.
+    """
+    index = {}
+    for directory in directories:
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith('.py') or file_name.startswith('.'):
+                continue
+            module_name = os.path.normpath(os.path.join(directory, file_name[:-3])).replace(os.sep, '.')
+            try:
+                with open(os.path.join(directory, file_name)) as source_file:
+                    tree = ast.parse(source_file.read())
+            except (SyntaxError, UnicodeDecodeError):
+                continue
+            for node in tree.body:
+                if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and not node.name.startswith('_'):
+                    index.setdefault(node.name, '%s:%s' % (module_name, node.name))
+    with open(path, 'w') as index_file:
+        json.dump(index, index_file, indent=2, sort_keys=True)
+    return index
+
+
+def main():
+    from optparse import OptionParser
+    usage_str = """
+    USAGE:      python registry.py <options> <directories>
+    EXAMPLES:   python registry.py -o registry_index.json . PCF
+                  - indexes the functions and classes of this directory and of PCF
+    """
+    parser = OptionParser(usage_str)
+    parser.add_option('-o', '--output', dest='output',
+                      help='the file to write the index to', default=DEFAULT_INDEX_PATH)
+    options, directories = parser.parse_args()
+    index = build_index(directories or ['.'], options.output)
+    print('%d names indexed in %s' % (len(index), options.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@
 In search.py, you will implement generic search algorithms
 """
 
+import sys
+import time
+
 import util
 
 
@@ -48,88 +51,264 @@ class SearchProblem:
         """
         util.raiseNotDefined()
 
+    def get_moves(self, state):
+        """
+        state: Search state
+
+        Optional, for the in-place searches (depth_first_search_in_place and
+        ida_star_search): like get_successors, but returns a list of pairs
+        (action, stepCost) without building the successors
+        """
+        util.raiseNotDefined()
+
+    def get_successor(self, state, action):
+        """
+        Optional, for the lazy searches (breadth_first_search_lazy and
+        a_star_search_lazy): returns the successor reached by applying
+        'action' (one of the actions of get_moves) to 'state'
+        """
+        util.raiseNotDefined()
+
+    def push_action(self, state, action):
+        """
+        Optional, for the in-place searches: apply 'action' to 'state' in place
+        """
+        util.raiseNotDefined()
+
+    def pop_action(self, state):
+        """
+        Optional, for the in-place searches: take back the last action pushed
+        on 'state'
+        """
+        util.raiseNotDefined()
+
+
+class SearchObserver:
+    """
+    Receives the events of a search it is given to (as observer). The
+    methods do nothing: override the ones of interest.
+
+    The in-place searches (depth_first_search_in_place, ida_star_search)
+    pass their single state, which changes as soon as the method returns.
+    """
+
+    def on_expand(self, state, fringe_size, closed_size):
+        """
+        state is about to be expanded; fringe_size nodes are left in the
+        fringe, and closed_size states have been reached so far
+        """
+        pass
+
+    def on_generate(self, state, action):
+        """
+        state, reached by action, is new or reached more cheaply than before
+        """
+        pass
+
+    def on_duplicate(self, state, action):
+        """
+        state, reached by action, is dropped: it was reached as cheaply before
+        """
+        pass
+
+    def on_goal(self, state):
+        """
+        state is the goal the search returns the actions to
+        """
+        pass
+
+
+def default_state_key(state):
+    """
+    Returns state.key() if the state has a compact key, or else the state.
+    """
+    key = getattr(state, 'key', None)
+    return key() if key is not None else state
+
 
 def get_actions(visited, goal):
+    """
+    Returns the actions leading to <goal> (a state key), walking the
+    predecessors map visited: key -> (predecessor key, action) back to the
+    start state, whose predecessor is None.
+    """
     actions = list()
     predecessor, action = visited[goal]
-    while predecessor:
+    while predecessor is not None:
         actions.append(action)
         predecessor, action = visited[predecessor]
     actions.reverse()
     return actions
 
 
-def depth_first_search(problem):
+def depth_first_search(problem, state_key=default_state_key, observer=None):
     """
     Search the deepest nodes in the search tree first,
     implementing a graph search algorithm.
     returns a list of actions that reaches the goal.
     """
-    # Fringe is a stack (LIFO)
+    # Fringe is a stack (LIFO) of (state, key)
     fringe = util.Stack()
     start_state = problem.get_start_state()
-    fringe.push(start_state)
-    # Predecessors map: state -> (pre, action)
-    visited = {start_state: (None, None)}
+    start_key = state_key(start_state)
+    fringe.push((start_state, start_key))
+    # Predecessors map: key -> (pre key, action)
+    visited = {start_key: (None, None)}
 
     while not fringe.isEmpty():
-        current = fringe.pop()
+        current, current_key = fringe.pop()
         if problem.is_goal_state(current):
-            return get_actions(visited, current)
+            if observer is not None:
+                observer.on_goal(current)
+            return get_actions(visited, current_key)
+        if observer is not None:
+            observer.on_expand(current, len(fringe), len(visited))
         for state, action, cost in problem.get_successors(current):
-            if state not in visited:
-                visited[state] = (current, action)
-                fringe.push(state)
+            key = state_key(state)
+            if key not in visited:
+                visited[key] = (current_key, action)
+                fringe.push((state, key))
+                if observer is not None:
+                    observer.on_generate(state, action)
+            elif observer is not None:
+                observer.on_duplicate(state, action)
+    return list()
+
+
+def depth_first_search_in_place(problem, observer=None):
+    """
+    Search the deepest nodes in the search tree first, like
+    depth_first_search, but on a single state: actions are applied and
+    taken back with problem.push_action/pop_action, and only state.key()
+    of the visited states is stored.
+    """
+    state = problem.get_start_state()
+    if problem.is_goal_state(state):
+        if observer is not None:
+            observer.on_goal(state)
+        return list()
+    visited = {state.key()}
+    # Actions applied to state, and the actions left to try after each of them
+    path = []
+    if observer is not None:
+        observer.on_expand(state, 0, len(visited))
+    fringe = [reversed(problem.get_moves(state))]
+
+    while fringe:
+        for action, cost in fringe[-1]:
+            problem.push_action(state, action)
+            key = state.key()
+            if key in visited:
+                if observer is not None:
+                    observer.on_duplicate(state, action)
+                problem.pop_action(state)
+                continue
+            visited.add(key)
+            path.append(action)
+            if observer is not None:
+                observer.on_generate(state, action)
+            if problem.is_goal_state(state):
+                if observer is not None:
+                    observer.on_goal(state)
+                # Leave the start state as we found it
+                for _ in path:
+                    problem.pop_action(state)
+                return path
+            if observer is not None:
+                observer.on_expand(state, len(fringe), len(visited))
+            fringe.append(reversed(problem.get_moves(state)))
+            break
+        else:
+            fringe.pop()
+            if path:
+                path.pop()
+                problem.pop_action(state)
     return list()
 
 
-def breadth_first_search(problem):
+def breadth_first_search(problem, state_key=default_state_key, observer=None):
     """
     Search the shallowest nodes in the search tree first.
     """
-    # Fringe is a Queue (FIFO)
+    # Fringe is a Queue (FIFO) of (state, key)
     fringe = util.Queue()
     start_state = problem.get_start_state()
-    fringe.push(start_state)
-    # Predecessors map: state -> (pre, action)
-    visited = {start_state: (None, None)}
+    start_key = state_key(start_state)
+    fringe.push((start_state, start_key))
+    # Predecessors map: key -> (pre key, action)
+    visited = {start_key: (None, None)}
 
     while not fringe.isEmpty():
-        current = fringe.pop()
+        current, current_key = fringe.pop()
         if problem.is_goal_state(current):
-            return get_actions(visited, current)
+            if observer is not None:
+                observer.on_goal(current)
+            return get_actions(visited, current_key)
+        if observer is not None:
+            observer.on_expand(current, len(fringe), len(visited))
         for state, action, cost in problem.get_successors(current):
-            if state not in visited:
-                visited[state] = (current, action)
-                fringe.push(state)
+            key = state_key(state)
+            if key not in visited:
+                visited[key] = (current_key, action)
+                fringe.push((state, key))
+                if observer is not None:
+                    observer.on_generate(state, action)
+            elif observer is not None:
+                observer.on_duplicate(state, action)
     return list()
 
 
-def uniform_cost_search(problem):
+def breadth_first_search_lazy(problem, state_key=default_state_key, observer=None):
     """
-    Search the node of least total cost first.
+    Search the shallowest nodes in the search tree first, like
+    breadth_first_search, but the fringe only holds (parent, action) records:
+    a successor is built with problem.get_successor when its record is
+    popped, and duplicates are dropped then.
     """
-    # Fringe is a PriorityQueue
-    fringe = util.PriorityQueue()
     start_state = problem.get_start_state()
-    fringe.push(start_state, 0)
-    # Predecessors map: state -> (pre, action)
-    visited = {start_state: (None, None)}
-    # Accumulated cost map: state -> cost from start
-    costs = {start_state: 0}
+    if problem.is_goal_state(start_state):
+        if observer is not None:
+            observer.on_goal(start_state)
+        return list()
+    # Fringe is a Queue (FIFO) of (parent, parent key, action) records
+    fringe = util.Queue()
+    start_key = state_key(start_state)
+    if observer is not None:
+        observer.on_expand(start_state, 0, 1)
+    for action, cost in problem.get_moves(start_state):
+        fringe.push((start_state, start_key, action))
+    # Predecessors map: key -> (pre key, action)
+    visited = {start_key: (None, None)}
 
     while not fringe.isEmpty():
-        current = fringe.pop()
+        parent, parent_key, action = fringe.pop()
+        current = problem.get_successor(parent, action)
+        current_key = state_key(current)
+        if current_key in visited:
+            if observer is not None:
+                observer.on_duplicate(current, action)
+            continue
+        visited[current_key] = (parent_key, action)
+        if observer is not None:
+            observer.on_generate(current, action)
         if problem.is_goal_state(current):
-            return get_actions(visited, current)
-        for state, action, cost in problem.get_successors(current):
-            if state not in visited:
-                visited[state] = (current, action)
-                costs[state] = costs[current] + cost
-                fringe.push(state, costs[state])
+            if observer is not None:
+                observer.on_goal(current)
+            return get_actions(visited, current_key)
+        if observer is not None:
+            observer.on_expand(current, len(fringe), len(visited))
+        for action, cost in problem.get_moves(current):
+            fringe.push((current, current_key, action))
     return list()
 
 
+def uniform_cost_search(problem, state_key=default_state_key, observer=None):
+    """
+    Search the node of least total cost first.
+    """
+    return a_star_search(problem, state_key=state_key, observer=observer)
+
+
 def null_heuristic(state, problem=None):
     """
     A heuristic function estimates the cost from the current state to the nearest
@@ -138,33 +317,590 @@ def null_heuristic(state, problem=None):
     return 0
 
 
-def a_star_search(problem, heuristic=null_heuristic):
+def a_star_search(problem, heuristic=null_heuristic, state_key=default_state_key, observer=None):
     """
     Search the node that has the lowest combined cost and heuristic first.
+
+    A state is only generated again through a cheaper path: if it is still
+    queued its priority is lowered, and if it was already expanded (possible
+    with an inconsistent heuristic) it is reopened. Among states with the
+    same cost + heuristic, the one closest to the goal is expanded first.
     """
-    # Fringe is a PriorityQueueWithFunction
-    fringe = util.PriorityQueueWithFunction(lambda x: costs[x] + heuristic(x, problem))
+    # Fringe is an IndexedPriorityQueue of keys by (cost + heuristic,
+    # heuristic), so each state is queued once
+    fringe = util.IndexedPriorityQueue()
     start_state = problem.get_start_state()
-    # Predecessors map: state -> (pre, action)
-    visited = {start_state: (None, None)}
-    # Accumulated cost map: state -> cost from start
-    costs = {start_state: 0}
-    fringe.push(start_state)
+    start_key = state_key(start_state)
+    # States of the queued keys; expanded states are dropped
+    open_states = {start_key: start_state}
+    # Predecessors map: key -> (pre key, action) on the cheapest known path
+    visited = {start_key: (None, None)}
+    # Accumulated cost map: key -> cheapest known cost from start
+    costs = {start_key: 0}
+    # Heuristic map: key -> heuristic(state), computed once per state
+    estimates = {start_key: heuristic(start_state, problem)}
+    fringe.push(start_key, (estimates[start_key], estimates[start_key]))
 
     while not fringe.isEmpty():
-        current = fringe.pop()
+        current_key = fringe.pop()
+        current = open_states.pop(current_key)
         if problem.is_goal_state(current):
-            return get_actions(visited, current)
+            if observer is not None:
+                observer.on_goal(current)
+            return get_actions(visited, current_key)
+        if observer is not None:
+            observer.on_expand(current, len(fringe), len(costs))
         for state, action, cost in problem.get_successors(current):
-            if state not in visited:
-                visited[state] = (current, action)
-                costs[state] = costs[current] + cost
-                fringe.push(state)
+            key = state_key(state)
+            new_cost = costs[current_key] + cost
+            if key in costs and costs[key] <= new_cost:
+                if observer is not None:
+                    observer.on_duplicate(state, action)
+                continue
+            if observer is not None:
+                observer.on_generate(state, action)
+            visited[key] = (current_key, action)
+            costs[key] = new_cost
+            if key not in estimates:
+                estimates[key] = heuristic(state, problem)
+            # Queues the state again if it was expanded already
+            open_states[key] = state
+            fringe.push(key, (new_cost + estimates[key], estimates[key]))
+    return list()
+
+
+def uniform_cost_search_lazy(problem, state_key=default_state_key, observer=None):
+    """
+    Search the node of least total cost first, building successors only when
+    they are popped (see a_star_search_lazy).
+    """
+    return a_star_search_lazy(problem, state_key=state_key, observer=observer)
+
+
+def a_star_search_lazy(problem, heuristic=null_heuristic, state_key=default_state_key, observer=None,
+                       consistent=False):
+    """
+    A*, but expanding a node does not build its successors: the fringe holds
+    (f, h, state, parent, action, cost) records with state None, queued with
+    an estimate from the parent and the move alone, which must not exceed the
+    successor's f. The successor is built (with problem.get_successor) and its
+    heuristic computed when the record is popped; if its real f is higher, it
+    is queued again with it.
+
+    The estimate is the successor's cost, which is all an admissible
+    heuristic guarantees, so the plans are optimal like a_star_search's. If
+    the heuristic is consistent (it never drops by more than the step cost),
+    consistent=True estimates with the larger of that and the parent's f,
+    which keeps more successors unbuilt. The blokus heuristics are not
+    consistent: with them that estimate can exceed the successors' f, and the
+    search then returns suboptimal plans.
+    """
+    # Fringe is a PriorityQueue of records, by (f, h); a record's parent is
+    # a (state, key) pair
+    fringe = util.PriorityQueue()
+    start_state = problem.get_start_state()
+    start_key = state_key(start_state)
+    # Predecessors map: key -> (pre key, action) on the cheapest known path
+    visited = {start_key: (None, None)}
+    # Accumulated cost map: key -> cheapest known cost from start
+    costs = {start_key: 0}
+    h = heuristic(start_state, problem)
+    fringe.push((h, h, (start_state, start_key), None, None, 0), (h, h))
+
+    while not fringe.isEmpty():
+        f, h, current, parent, action, cost = fringe.pop()
+        if current is None:
+            state = problem.get_successor(parent[0], action)
+            key = state_key(state)
+            if key in costs and costs[key] <= cost:
+                if observer is not None:
+                    observer.on_duplicate(state, action)
+                continue
+            if observer is not None:
+                observer.on_generate(state, action)
+            costs[key] = cost
+            visited[key] = (parent[1], action)
+            current = (state, key)
+            h = heuristic(state, problem)
+            if cost + h > f:
+                fringe.push((cost + h, h, current, parent, action, cost), (cost + h, h))
+                continue
+        elif costs[current[1]] < cost:
+            # Reached more cheaply since it was queued
+            continue
+        if problem.is_goal_state(current[0]):
+            if observer is not None:
+                observer.on_goal(current[0])
+            return get_actions(visited, current[1])
+        if observer is not None:
+            observer.on_expand(current[0], len(fringe), len(costs))
+        for action, step_cost in problem.get_moves(current[0]):
+            estimate = max(cost + h, cost + step_cost) if consistent else cost + step_cost
+            fringe.push((estimate, h, None, current, action, cost + step_cost), (estimate, h))
+    return list()
+
+
+def ida_star_search(problem, heuristic=null_heuristic, observer=None):
+    """
+    Iterative deepening A*: repeated depth-first searches on a single state
+    (see depth_first_search_in_place), each one bounded by the smallest
+    f = cost + heuristic that exceeded the previous bound. Memory use is
+    linear in the depth of the solution.
+    """
+    state = problem.get_start_state()
+    path = []
+    on_path = {state.key()}
+
+    def bounded_search(cost, bound):
+        """
+        Returns None if a goal was found below state (path then leads to it),
+        or else the smallest f that exceeded bound
+        """
+        f = cost + heuristic(state, problem)
+        if f > bound:
+            return f
+        if problem.is_goal_state(state):
+            if observer is not None:
+                observer.on_goal(state)
+            return None
+        if observer is not None:
+            observer.on_expand(state, len(path), len(on_path))
+        next_bound = float('inf')
+        for action, step_cost in problem.get_moves(state):
+            problem.push_action(state, action)
+            key = state.key()
+            if key in on_path:
+                if observer is not None:
+                    observer.on_duplicate(state, action)
+            else:
+                if observer is not None:
+                    observer.on_generate(state, action)
+                on_path.add(key)
+                path.append(action)
+                t = bounded_search(cost + step_cost, bound)
+                if t is None:
+                    return None
+                next_bound = min(next_bound, t)
+                path.pop()
+                on_path.remove(key)
+            problem.pop_action(state)
+        return next_bound
+
+    bound = heuristic(state, problem)
+    while bound != float('inf'):
+        bound = bounded_search(0, bound)
+        if bound is None:
+            actions = path[:]
+            # Leave the start state as we found it
+            for _ in actions:
+                problem.pop_action(state)
+            return actions
+    return list()
+
+
+class SMANode:
+    """
+    A node of the search tree kept in memory by sma_star_search.
+
+    f is the node's backed-up cost + heuristic: the lowest f of its subtree,
+    including the children that were forgotten to save memory (their lowest f
+    is kept in forgotten until the node is expanded again).
+    """
+    __slots__ = ('state', 'parent', 'action', 'cost', 'f', 'depth', 'children', 'forgotten')
+
+    def __init__(self, state, parent, action, cost, f):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.cost = cost
+        self.f = f
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.children = {}
+        self.forgotten = float('inf')
+
+
+def estimate_state_bytes(state):
+    """
+    A rough estimate of the memory held by one search state: the object and
+    each of its attributes (numpy arrays count with their buffers).
+    """
+    size = sys.getsizeof(state)
+    for value in getattr(state, '__dict__', {}).values():
+        size += getattr(value, 'nbytes', sys.getsizeof(value))
+    return size
+
+
+# Bytes of an item of a dict (amortized over its table) and of a list slot
+DICT_ENTRY_BYTES = sys.getsizeof(dict.fromkeys(range(1 << 10))) // (1 << 10)
+POINTER_BYTES = sys.getsizeof([None]) - sys.getsizeof([])
+
+
+def estimate_node_bytes(node):
+    """
+    A rough estimate of the memory one node of sma_star_search holds: the
+    SMANode with its cost, f and empty children dict, its state, its items in
+    its parent's children and in the in-memory dict, and its entries in the
+    fringe and leaves queues (the [priority, count, node] list, the priority
+    tuple, the heap slot and the index item).
+    """
+    queue_entry = (sys.getsizeof([None, 0, None]) + sys.getsizeof((0.0, 0)) + sys.getsizeof(0)
+                   + POINTER_BYTES + DICT_ENTRY_BYTES)
+    return (sys.getsizeof(node) + sys.getsizeof(node.cost) + sys.getsizeof(node.f) + sys.getsizeof(node.children)
+            + estimate_state_bytes(node.state) + 2 * DICT_ENTRY_BYTES + 2 * queue_entry)
+
+
+# Node budget of sma_star_search when neither max_nodes nor max_bytes is given
+SMA_DEFAULT_MAX_NODES = 100000
+
+
+def sma_star_search(problem, heuristic=null_heuristic, max_nodes=None, max_bytes=None, observer=None):
+    """
+    Simplified memory-bounded A*: A* that keeps at most max_nodes nodes (or
+    about max_bytes bytes of nodes) in memory. When the budget is exceeded,
+    the shallowest leaf with the highest f is forgotten and its f is backed
+    up into its parent, which is queued again so the leaf can be regenerated
+    if it turns out to be needed. Trades time (regeneration) for a fixed
+    memory ceiling.
+
+    max_bytes is turned into a node budget with the estimate_node_bytes of
+    the root, so it covers the nodes, their states and their entries in the
+    search's queues and dicts, but not the problem, the heuristic's own
+    memory or the successors of the node being expanded.
+    """
+    start_state = problem.get_start_state()
+    root = SMANode(start_state, None, None, 0, heuristic(start_state, problem))
+    if max_nodes is None:
+        if max_bytes is None:
+            max_nodes = SMA_DEFAULT_MAX_NODES
+        else:
+            max_nodes = max(max_bytes // estimate_node_bytes(root), 2)
+
+    # Fringe: nodes to expand, best (lowest f, deepest) first
+    fringe = util.IndexedPriorityQueue()
+    fringe.push(root, (root.f, 0))
+    # Leaves: nodes without children in memory, worst (highest f, shallowest) first
+    leaves = util.IndexedPriorityQueue()
+    # States in memory, to skip successors already reached as cheaply
+    in_memory = {start_state: root}
+    num_nodes = 1
+
+    def forget(node):
+        """
+        Drop leaf <node> from memory, backing up its f into its parent
+        """
+        nonlocal num_nodes
+        num_nodes -= 1
+        if fringe.contains(node):
+            fringe.remove(node)
+        if leaves.contains(node):
+            leaves.remove(node)
+        if in_memory.get(node.state) is node:
+            del in_memory[node.state]
+        parent = node.parent
+        del parent.children[node.state]
+        if node.f != float('inf'):
+            # The parent has to be expanded again to regenerate node
+            parent.forgotten = min(parent.forgotten, node.f)
+            if not fringe.contains(parent):
+                fringe.push(parent, (parent.f, -parent.depth))
+        if not parent.children and parent is not root:
+            leaves.push(parent, (-parent.f, parent.depth))
+
+    def back_up(node):
+        """
+        Update the f of <node> and its ancestors from their children
+        """
+        while node is not None:
+            best = min([child.f for child in node.children.values()] + [node.forgotten])
+            if best <= node.f:
+                break
+            node.f = best
+            if fringe.contains(node):
+                fringe.remove(node)
+                fringe.push(node, (node.f, -node.depth))
+            if leaves.contains(node):
+                leaves.remove(node)
+                leaves.push(node, (-node.f, node.depth))
+            node = node.parent
+
+    while not fringe.isEmpty():
+        node = fringe.pop()
+        if node.f == float('inf'):
+            break
+        if problem.is_goal_state(node.state):
+            if observer is not None:
+                observer.on_goal(node.state)
+            actions = list()
+            while node.parent is not None:
+                actions.append(node.action)
+                node = node.parent
+            actions.reverse()
+            return actions
+
+        # (Re)generate the successors that are not in memory
+        node.forgotten = float('inf')
+        if observer is not None:
+            observer.on_expand(node.state, len(fringe), num_nodes)
+        for state, action, cost in problem.get_successors(node.state):
+            if state in node.children:
+                continue
+            known = in_memory.get(state)
+            if known is not None and known.cost <= node.cost + cost:
+                if observer is not None:
+                    observer.on_duplicate(state, action)
+                continue
+            if observer is not None:
+                observer.on_generate(state, action)
+            # The f of a child is never below the f of its parent (pathmax)
+            f = max(node.f, node.cost + cost + heuristic(state, problem))
+            child = SMANode(state, node, action, node.cost + cost, f)
+            node.children[state] = child
+            in_memory[state] = child
+            num_nodes += 1
+            fringe.push(child, (child.f, -child.depth))
+            leaves.push(child, (-child.f, child.depth))
+        if node.children and leaves.contains(node):
+            leaves.remove(node)
+
+        if not node.children:
+            # Dead end: nothing below this node can reach a goal
+            node.f = float('inf')
+            if node is root:
+                break
+            parent = node.parent
+            forget(node)
+            back_up(parent)
+        else:
+            back_up(node)
+
+        while num_nodes > max_nodes and not leaves.isEmpty():
+            worst = leaves.peek()
+            if not fringe.isEmpty() and worst is fringe.peek():
+                # Never forget the node that is about to be expanded
+                break
+            forget(worst)
     return list()
 
 
+def beam_search(problem, heuristic=null_heuristic, beam_width=20, deadline=None,
+                state_key=default_state_key):
+    """
+    Search depth by depth, keeping only the beam_width states with the lowest
+    heuristic at each depth. Fast but incomplete: returns (actions, cost) of
+    the first goal generated, or None if the beam dies out or time.time()
+    passes deadline.
+    """
+    start_state = problem.get_start_state()
+    start_key = state_key(start_state)
+    if problem.is_goal_state(start_state):
+        return list(), 0
+    # Predecessors map: key -> (pre key, action)
+    visited = {start_key: (None, None)}
+    # The states of the current depth, as (state, key, cost)
+    beam = [(start_state, start_key, 0)]
+
+    while beam:
+        layer = []
+        for current, current_key, current_cost in beam:
+            if deadline is not None and time.time() > deadline:
+                return None
+            for state, action, cost in problem.get_successors(current):
+                key = state_key(state)
+                if key in visited:
+                    continue
+                visited[key] = (current_key, action)
+                if problem.is_goal_state(state):
+                    return get_actions(visited, key), current_cost + cost
+                layer.append((heuristic(state, problem), current_cost + cost, state, key))
+        layer.sort(key=lambda entry: entry[:2])
+        beam = [(state, key, cost) for h, cost, state, key in layer[:beam_width]]
+    return None
+
+
+def weighted_a_star_search(problem, heuristic=null_heuristic, weight=1, deadline=None,
+                           bound=float('inf'), state_key=default_state_key, observer=None):
+    """
+    A* on cost + weight * heuristic: with an admissible heuristic, the plan
+    found costs at most weight times the optimal one. Nodes that cost bound
+    or more are pruned. Returns (actions, cost), or None if there is no plan
+    cheaper than bound or time.time() passes deadline.
+    """
+    fringe = util.IndexedPriorityQueue()
+    start_state = problem.get_start_state()
+    start_key = state_key(start_state)
+    open_states = {start_key: start_state}
+    # Predecessors map: key -> (pre key, action) on the cheapest known path
+    visited = {start_key: (None, None)}
+    costs = {start_key: 0}
+    estimates = {start_key: heuristic(start_state, problem)}
+    fringe.push(start_key, (weight * estimates[start_key], estimates[start_key]))
+
+    while not fringe.isEmpty():
+        if deadline is not None and time.time() > deadline:
+            return None
+        current_key = fringe.pop()
+        current = open_states.pop(current_key)
+        if problem.is_goal_state(current):
+            if observer is not None:
+                observer.on_goal(current)
+            return get_actions(visited, current_key), costs[current_key]
+        if observer is not None:
+            observer.on_expand(current, len(fringe), len(costs))
+        for state, action, cost in problem.get_successors(current):
+            key = state_key(state)
+            new_cost = costs[current_key] + cost
+            if new_cost >= bound or (key in costs and costs[key] <= new_cost):
+                if observer is not None:
+                    observer.on_duplicate(state, action)
+                continue
+            if observer is not None:
+                observer.on_generate(state, action)
+            visited[key] = (current_key, action)
+            costs[key] = new_cost
+            if key not in estimates:
+                estimates[key] = heuristic(state, problem)
+            open_states[key] = state
+            fringe.push(key, (new_cost + weight * estimates[key], estimates[key]))
+    return None
+
+
+def ara_star_search(problem, heuristic=null_heuristic, weights=(1,), deadline=None,
+                    bound=float('inf'), on_solution=None, state_key=default_state_key, observer=None):
+    """
+    Anytime repairing A* (ARA*): weighted A* with each of the decreasing
+    weights in turn, reusing the work of the previous weights. A node whose
+    cost is lowered after it was expanded is set aside as inconsistent
+    instead of being reopened; when the weight drops, the inconsistent nodes
+    rejoin the open ones, all of them are queued by cost + weight * heuristic
+    again and the closed list is emptied.
+
+    Unlike ARA*, which stops a weight once no open node has a weighted f
+    below the cost of the best plan (sound only for an admissible
+    heuristic), each weight stops at the first plan cheaper than the best
+    one, or once no open node costs less than it; nodes that cost as much as
+    the best plan are pruned.
+
+    on_solution(actions, cost), if given, is called with every plan cheaper
+    than bound. Returns (actions, cost) of the best one, or None if none was
+    found before time.time() passed deadline.
+    """
+    start_state = problem.get_start_state()
+    start_key = state_key(start_state)
+    # States of the open and of the inconsistent keys
+    open_states = {start_key: start_state}
+    inconsistent = {}
+    closed = set()
+    # Predecessors map: key -> (pre key, action) on the cheapest known path
+    visited = {start_key: (None, None)}
+    costs = {start_key: 0}
+    estimates = {start_key: heuristic(start_state, problem)}
+    best = None
+
+    for weight in weights:
+        open_states.update(inconsistent)
+        inconsistent = {}
+        closed = set()
+        fringe = util.IndexedPriorityQueue()
+        for key in open_states:
+            fringe.push(key, (costs[key] + weight * estimates[key], estimates[key]))
+
+        while not fringe.isEmpty():
+            if deadline is not None and time.time() > deadline:
+                return best
+            current_key = fringe.pop()
+            current = open_states.pop(current_key)
+            if costs[current_key] >= bound:
+                # Queued before the bound dropped
+                continue
+            closed.add(current_key)
+            if problem.is_goal_state(current):
+                if observer is not None:
+                    observer.on_goal(current)
+                bound = costs[current_key]
+                best = get_actions(visited, current_key), bound
+                if on_solution is not None:
+                    on_solution(*best)
+                break
+            if observer is not None:
+                observer.on_expand(current, len(fringe), len(costs))
+            for state, action, cost in problem.get_successors(current):
+                key = state_key(state)
+                new_cost = costs[current_key] + cost
+                if new_cost >= bound or (key in costs and costs[key] <= new_cost):
+                    if observer is not None:
+                        observer.on_duplicate(state, action)
+                    continue
+                if observer is not None:
+                    observer.on_generate(state, action)
+                visited[key] = (current_key, action)
+                costs[key] = new_cost
+                if key not in estimates:
+                    estimates[key] = heuristic(state, problem)
+                if key in closed:
+                    inconsistent[key] = state
+                else:
+                    open_states[key] = state
+                    fringe.push(key, (new_cost + weight * estimates[key], estimates[key]))
+    return best
+
+
+# Seconds anytime_search runs for when no time_limit is given
+ANYTIME_DEFAULT_TIME_LIMIT = 10.0
+# Widths of the successive beam searches, then weights of the ARA* search of
+# anytime_search
+ANYTIME_BEAM_WIDTHS = (1, 4, 16)
+ANYTIME_WEIGHTS = (5, 3, 2, 1.5, 1)
+
+
+def anytime_search(problem, heuristic=null_heuristic, time_limit=ANYTIME_DEFAULT_TIME_LIMIT,
+                   beam_widths=ANYTIME_BEAM_WIDTHS, weights=ANYTIME_WEIGHTS, on_solution=None,
+                   state_key=default_state_key):
+    """
+    Anytime search within time_limit seconds of wall-clock time: beam
+    searches of increasing widths (the first, of width 1, is greedy) find a
+    first plan quickly, then ARA* with the decreasing weights looks for
+    cheaper ones, pruning the nodes that cost as much as the best plan so
+    far. Returns the best plan found when time runs out or the last weight is
+    done (an empty list if there is none).
+
+    Until a first plan is found the beam searches ignore time_limit, so a
+    plan is returned whenever one of them finds one, even if that takes
+    longer than time_limit.
+
+    on_solution(actions, cost), if given, is called with every better plan.
+    """
+    deadline = time.time() + time_limit
+    best_actions, best_cost = list(), float('inf')
+
+    def improve(actions, cost):
+        nonlocal best_actions, best_cost
+        if cost < best_cost:
+            best_actions, best_cost = actions, cost
+            if on_solution is not None:
+                on_solution(actions, cost)
+
+    for width in beam_widths:
+        if best_cost < float('inf') and time.time() > deadline:
+            break
+        found = beam_search(problem, heuristic, width, deadline if best_cost < float('inf') else None, state_key)
+        if found is not None:
+            improve(*found)
+    if time.time() <= deadline:
+        ara_star_search(problem, heuristic, weights, deadline, best_cost, improve, state_key)
+    return best_actions
+
+
 # Abbreviations
 bfs = breadth_first_search
 dfs = depth_first_search
 astar = a_star_search
 ucs = uniform_cost_search
+bfs_lazy = breadth_first_search_lazy
+ucs_lazy = uniform_cost_search_lazy
+astar_lazy = a_star_search_lazy
+dfs_in_place = depth_first_search_in_place
+idastar = ida_star_search
+smastar = sma_star_search
+wastar = weighted_a_star_search
+arastar = ara_star_search
+anytime = anytime_search
@@ -0,0 +1,227 @@
+"""
+Profiling of the searches of search.py.
+
+SearchProfiler observes a search (see search.SearchObserver) and times its
+phases: it runs the search on a stand-in for the problem, with wrapped
+heuristic and state_key functions, so it knows the time spent generating
+successors, testing for the goal, evaluating the heuristic and hashing the
+reached states (state_key, by which duplicates are found). The rest of the
+search's time goes to its fringe and its own bookkeeping. It also samples
+the sizes of the fringe and of the closed set as the search goes, and
+reports all of it as text or JSON:
+
+    profiler = SearchProfiler()
+    actions = profiler.run(search.astar, problem, blokus_corners_heuristic)
+    print(profiler.format_report())
+    profiler.write_json('profile.json')
+"""
+
+import inspect
+import json
+import time
+
+from search import SearchObserver
+
+# The phases of a search, as they appear in the report: 'queue' is the time
+# not spent in the others
+PHASES = ('successors', 'goal_test', 'heuristic', 'hashing', 'queue')
+# Expansions between two samples of the fringe and closed set sizes
+DEFAULT_SAMPLE_EVERY = 100
+
+
+class ProfiledProblem:
+    """
+    Stands for a search problem, timing its successor generation (including
+    the moves of the lazy and in-place searches) and its goal tests. Other
+    attributes are the problem's.
+    """
+
+    def __init__(self, problem, profiler):
+        self.problem = problem
+        self.profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+    def get_start_state(self):
+        return self.problem.get_start_state()
+
+    def is_goal_state(self, state):
+        start_time = time.perf_counter()
+        try:
+            return self.problem.is_goal_state(state)
+        finally:
+            self.profiler.add_time('goal_test', time.perf_counter() - start_time)
+
+    def get_successors(self, state):
+        start_time = time.perf_counter()
+        try:
+            return self.problem.get_successors(state)
+        finally:
+            self.profiler.add_time('successors', time.perf_counter() - start_time)
+
+    def get_moves(self, state):
+        start_time = time.perf_counter()
+        try:
+            return self.problem.get_moves(state)
+        finally:
+            self.profiler.add_time('successors', time.perf_counter() - start_time)
+
+    def get_successor(self, state, action):
+        start_time = time.perf_counter()
+        try:
+            return self.problem.get_successor(state, action)
+        finally:
+            self.profiler.add_time('successors', time.perf_counter() - start_time)
+
+    def push_action(self, state, action):
+        start_time = time.perf_counter()
+        try:
+            return self.problem.push_action(state, action)
+        finally:
+            self.profiler.add_time('successors', time.perf_counter() - start_time)
+
+    def pop_action(self, state):
+        start_time = time.perf_counter()
+        try:
+            return self.problem.pop_action(state)
+        finally:
+            self.profiler.add_time('successors', time.perf_counter() - start_time)
+
+
+class SearchProfiler(SearchObserver):
+    """
+    Counts the events of a search, times its phases and samples the sizes of
+    its fringe and closed set every sample_every expansions. A profiler
+    holds the profile of the last search it ran.
+    """
+
+    def __init__(self, sample_every=DEFAULT_SAMPLE_EVERY):
+        self.sample_every = sample_every
+        self.reset()
+
+    def reset(self):
+        self.search = None
+        self.wall_time = 0
+        self.plan_length = None
+        self.counts = {'expanded': 0, 'generated': 0, 'duplicates': 0, 'goals': 0}
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.peak_fringe = 0
+        self.peak_closed = 0
+        # (seconds, expanded, fringe size, closed set size)
+        self.samples = []
+        self.start_time = time.perf_counter()
+
+    def add_time(self, phase, seconds):
+        self.times[phase] += seconds
+        self.calls[phase] += 1
+
+    def on_expand(self, state, fringe_size, closed_size):
+        self.counts['expanded'] += 1
+        if fringe_size > self.peak_fringe:
+            self.peak_fringe = fringe_size
+        if closed_size > self.peak_closed:
+            self.peak_closed = closed_size
+        if self.counts['expanded'] % self.sample_every == 1 or self.sample_every == 1:
+            self.samples.append((time.perf_counter() - self.start_time, self.counts['expanded'],
+                                 fringe_size, closed_size))
+
+    def on_generate(self, state, action):
+        self.counts['generated'] += 1
+
+    def on_duplicate(self, state, action):
+        self.counts['duplicates'] += 1
+
+    def on_goal(self, state):
+        self.counts['goals'] += 1
+
+    def timed_heuristic(self, heuristic, problem):
+        """
+        Returns heuristic, timed, and called with problem whatever problem it
+        is given (the searches pass the ProfiledProblem).
+        """
+        def timed(state, _):
+            start_time = time.perf_counter()
+            try:
+                return heuristic(state, problem)
+            finally:
+                self.add_time('heuristic', time.perf_counter() - start_time)
+        return timed
+
+    def timed_state_key(self, state_key):
+        def timed(state):
+            start_time = time.perf_counter()
+            try:
+                return state_key(state)
+            finally:
+                self.add_time('hashing', time.perf_counter() - start_time)
+        return timed
+
+    def run(self, search_func, problem, heuristic=None, **kwargs):
+        """
+        Runs search_func(problem[, heuristic], **kwargs) under the profiler
+        and returns its result. The search is given the profiler as its
+        observer and a timed state_key if it takes them; the in-place
+        searches hash states with state.key() instead, which is not timed.
+        """
+        self.reset()
+        parameters = inspect.signature(search_func).parameters
+        if 'observer' in parameters:
+            kwargs['observer'] = self
+        if 'state_key' in parameters:
+            kwargs['state_key'] = self.timed_state_key(kwargs.get('state_key', parameters['state_key'].default))
+        args = () if heuristic is None else (self.timed_heuristic(heuristic, problem),)
+        self.search = getattr(getattr(search_func, 'func', search_func), '__name__', repr(search_func))
+
+        self.start_time = time.perf_counter()
+        result = search_func(ProfiledProblem(problem, self), *args, **kwargs)
+        self.wall_time = time.perf_counter() - self.start_time
+        # The fringe and the search's own loop take the rest of the time
+        self.times['queue'] = max(self.wall_time - sum(self.times[phase] for phase in PHASES[:-1]), 0)
+        self.calls['queue'] = self.counts['expanded']
+        plan = result[0] if isinstance(result, tuple) else result
+        self.plan_length = len(plan) if plan is not None else None
+        return result
+
+    def report(self):
+        """
+        Returns the profile of the last search run as a JSON-serializable dict.
+        """
+        return {
+            'search': self.search,
+            'wall_time': self.wall_time,
+            'plan_length': self.plan_length,
+            'counts': dict(self.counts),
+            'phases': {phase: {'seconds': self.times[phase], 'calls': self.calls[phase],
+                               'share': self.times[phase] / self.wall_time if self.wall_time else 0}
+                       for phase in PHASES},
+            'peak_fringe': self.peak_fringe,
+            'peak_closed': self.peak_closed,
+            'samples': [list(sample) for sample in self.samples],
+        }
+
+    def format_report(self):
+        """
+        Returns the profile of the last search run as text.
+        """
+        lines = ['%s: %.3fs, %s' % (self.search, self.wall_time,
+                                    'no plan' if self.plan_length is None
+                                    else 'plan of %d actions' % self.plan_length),
+                 '  expanded %(expanded)d, generated %(generated)d, duplicates %(duplicates)d' % self.counts,
+                 '  %-12s %10s %7s %10s' % ('phase', 'seconds', 'share', 'calls')]
+        for phase in PHASES:
+            share = self.times[phase] / self.wall_time if self.wall_time else 0
+            lines.append('  %-12s %10.4f %6.1f%% %10d' % (phase, self.times[phase], 100 * share,
+                                                         self.calls[phase]))
+        lines.append('  peak fringe %d, peak closed set %d' % (self.peak_fringe, self.peak_closed))
+        if self.samples:
+            lines.append('  %10s %10s %10s %10s' % ('seconds', 'expanded', 'fringe', 'closed'))
+            step = max(len(self.samples) // 10, 1)
+            for sample in self.samples[::step]:
+                lines.append('  %10.3f %10d %10d %10d' % sample)
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w') as report_file:
+            json.dump(self.report(), report_file, indent=2)
@@ -0,0 +1,165 @@
+"""
+A persistent cache of blokus puzzle solutions.
+
+Plans are stored in a sqlite file, keyed by a digest of everything that
+determines the solution: the puzzle type, the board size, the content of the
+piece list, the start point, the targets and the search (and heuristic) used,
+with the parameters its plan depends on (such as the time limit of the anytime
+searches).
+A cached plan is replayed on the puzzle's start board, and only returned if
+it is still legal and reaches the goal. The least recently used plans are
+evicted once the stored plans exceed max_bytes.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+
+from board import Move
+
+# Where game.py keeps the cache unless told otherwise
+DEFAULT_CACHE_PATH = 'solutions.sqlite'
+# Bytes of stored plans above which the least recently used are evicted
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def piece_list_digest(piece_list):
+    """
+    Returns a digest of the pieces of piece_list, in order: the same for two
+    piece lists read from files with the same pieces.
+    """
+    pieces = [sorted(sorted(ori) for ori in piece) for piece in piece_list]
+    return hashlib.sha256(json.dumps(pieces).encode()).hexdigest()
+
+
+def problem_digest(puzzle, board_w, board_h, piece_list, start, targets=(), search=None,
+                   heuristic=None, parameters=None):
+    """
+    Returns the cache key of a puzzle solved with the named search function
+    and heuristic, given the parameters dict of the search's options.
+    """
+    description = {
+        'puzzle': puzzle,
+        'board': [board_w, board_h],
+        'pieces': piece_list_digest(piece_list),
+        'start': list(start),
+        'targets': sorted(list(target) for target in targets),
+        'search': search,
+        'heuristic': heuristic,
+    }
+    if parameters:
+        # Only when given, so the keys of searches without any stay the same
+        description['parameters'] = parameters
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+def pack_plan(plan):
+    """
+    Returns plan as a JSON list of [piece_index, x, y, tiles] moves, where
+    tiles are the sorted tiles of the move's orientation.
+    """
+    return json.dumps([[move.piece_index, move.x, move.y, sorted(move.orientation)] for move in plan],
+                      separators=(',', ':'))
+
+
+def unpack_plan(packed, board):
+    """
+    Returns the moves of a plan packed by pack_plan, as moves on board.
+    """
+    plan = []
+    for piece_index, x, y, tiles in json.loads(packed):
+        orientation = frozenset(tuple(tile) for tile in tiles)
+        # The piece's own orientation object, like the moves the boards build
+        orientation = board.piece_list.packed_index[piece_index][orientation].orientation
+        plan.append(Move(board.piece_list.pieces[piece_index], piece_index, orientation, x, y))
+    return plan
+
+
+def plan_reaches_goal(problem, plan):
+    """
+    Replays plan from the problem's start state, and returns True if every
+    move is legal and the last one reaches the goal (every target covered,
+    for the sub-optimal puzzles).
+    """
+    state = problem.get_start_state()
+    for move in plan:
+        if not state.check_move_valid(0, move):
+            return False
+        state = state.do_move(0, move)
+    if hasattr(problem, 'is_goal_state'):
+        return problem.is_goal_state(state)
+    return all(state.get_position(target[1], target[0]) == 0 for target in problem.targets)
+
+
+class SolutionCache:
+    """
+    Plans by problem digest, stored in the sqlite file at path.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS solutions ('
+                                    'digest TEXT PRIMARY KEY, plan TEXT NOT NULL, '
+                                    'size INTEGER NOT NULL, last_used REAL NOT NULL)')
+
+    def get(self, digest, problem):
+        """
+        Returns the cached plan of problem, or None if there is none or it
+        does not solve the problem any more (it is then dropped).
+        """
+        row = self.connection.execute('SELECT plan FROM solutions WHERE digest = ?', (digest,)).fetchone()
+        if row is None:
+            return None
+        try:
+            plan = unpack_plan(row[0], problem.get_start_state())
+        except (ValueError, KeyError, IndexError, TypeError):
+            plan = None
+        with self.connection:
+            if plan is None or not plan_reaches_goal(problem, plan):
+                self.connection.execute('DELETE FROM solutions WHERE digest = ?', (digest,))
+                return None
+            self.connection.execute('UPDATE solutions SET last_used = ? WHERE digest = ?',
+                                    (time.time(), digest))
+        return plan
+
+    def put(self, digest, plan):
+        """
+        Stores plan, then evicts the least recently used plans until the
+        stored ones take at most max_bytes.
+        """
+        packed = pack_plan(plan)
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)',
+                                    (digest, packed, len(packed), time.time()))
+            total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM solutions').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self.connection.execute('SELECT digest, size FROM solutions ORDER BY last_used').fetchall()
+            for old_digest, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.connection.execute('DELETE FROM solutions WHERE digest = ?', (old_digest,))
+                total -= size
+
+    def cached(self, search_func, digest):
+        """
+        Wraps search_func(problem, ...) so it returns the cached plan when
+        there is a valid one, and caches the plans it finds.
+        """
+        def search(problem, *args, **kwargs):
+            plan = self.get(digest, problem)
+            if plan is None:
+                plan = search_func(problem, *args, **kwargs)
+                if plan:
+                    self.put(digest, plan)
+            return plan
+        return search
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,107 @@
+"""
+Board symmetries of the blokus puzzles.
+
+A mirror image or rotation of a board has mirrored successors, and reaches a
+goal at the same cost, as long as the symmetry keeps the start point and the
+goal tiles in place (every piece can be played in every orientation). Such
+boards are the same search node: CanonicalKey maps a board to the same key as
+its images, and can be given to the searches as their state_key.
+
+Only to searches that keep the first path to a key: a search that moves a
+key to a cheaper path (A*, uniform cost, HDA*) may reach a mirror image of
+the board whose successors were already generated, and return an illegal
+plan.
+"""
+
+import numpy as np
+
+
+def identity(a):
+    return a
+
+
+def flip_x(a):
+    return a[:, ::-1]
+
+
+def flip_y(a):
+    return a[::-1, :]
+
+
+def rotate_180(a):
+    return a[::-1, ::-1]
+
+
+def transpose(a):
+    return a.T
+
+
+def anti_transpose(a):
+    return a[::-1, ::-1].T
+
+
+def rotate_90(a):
+    return np.rot90(a)
+
+
+def rotate_270(a):
+    return np.rot90(a, 3)
+
+
+# The symmetries of a board, as functions of 2D arrays indexed [y, x]
+SYMMETRIES = [identity, flip_x, flip_y, rotate_180]
+# The symmetries of square boards only
+SQUARE_SYMMETRIES = [transpose, anti_transpose, rotate_90, rotate_270]
+
+
+def goal_tiles(problem, board_w, board_h):
+    """
+    Returns the tiles the problem's goal refers to, as a boolean [y, x]
+    array: the targets of cover problems (given as (row, col)) and the
+    corners of corners problems (given as (x, y)).
+    """
+    tiles = np.zeros((board_h, board_w), dtype=bool)
+    for (row, col) in getattr(problem, 'targets', []):
+        tiles[row, col] = True
+    for (x, y) in getattr(problem, 'corners', []):
+        tiles[y, x] = True
+    return tiles
+
+
+def detect_symmetries(problem):
+    """
+    Returns the symmetries that map the problem onto itself: the ones that
+    leave the start state (its tiles and the corners player 0 may start
+    from) and the goal tiles unchanged. identity always does.
+    """
+    state = problem.get_start_state()
+    board_w, board_h = state.board_w, state.board_h
+    attached = np.array([[state.check_tile_attached(0, x, y) for x in range(board_w)]
+                         for y in range(board_h)])
+    layers = (state.state, attached, goal_tiles(problem, board_w, board_h))
+
+    symmetries = SYMMETRIES + SQUARE_SYMMETRIES if board_w == board_h else SYMMETRIES
+    return [symmetry for symmetry in symmetries
+            if all(np.array_equal(symmetry(layer), layer) for layer in layers)]
+
+
+class CanonicalKey:
+    """
+    A state_key for the searches: the smallest key of the images of a board
+    under the given symmetries, so symmetric boards share one key.
+    """
+
+    def __init__(self, symmetries):
+        self.symmetries = list(symmetries)
+
+    def __call__(self, state):
+        board = state.state
+        pieces = np.packbits(state.pieces).tobytes()
+        return min(symmetry(board).tobytes() for symmetry in self.symmetries) + pieces
+
+
+def canonical_key(problem):
+    """
+    Returns a CanonicalKey under the symmetries detected for the problem.
+    """
+    return CanonicalKey(detect_symmetries(problem))
@@ -9,6 +9,7 @@
 import sys
 import inspect
 import heapq, random
+from collections import OrderedDict
 
 """
  Data structures useful for implementing SearchAgents
@@ -33,6 +34,9 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
@@ -55,6 +59,9 @@ class Queue:
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 
 class PriorityQueue:
     """
@@ -65,30 +72,138 @@ class PriorityQueue:
 
       Note that this PriorityQueue does not allow you to change the priority
       of an item.  However, you may insert the same item multiple times with
-      different priorities.
+      different priorities. Items with equal priorities are popped in the
+      order they were pushed, so the items themselves are never compared.
     """
 
     def __init__(self):
         self.heap = []
-        self.init = False
+        self.count = 0
 
     def push(self, item, priority):
-        if not self.init:
-            self.init = True
-            try:
-                item < item
-            except:
-                item.__class__.__lt__ = lambda x, y: (True)
-        pair = (priority, item)
-        heapq.heappush(self.heap, pair)
+        entry = (priority, self.count, item)
+        heapq.heappush(self.heap, entry)
+        self.count += 1
 
     def pop(self):
-        (priority, item) = heapq.heappop(self.heap)
+        (priority, count, item) = heapq.heappop(self.heap)
         return item
 
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def __len__(self):
+        return len(self.heap)
+
+
+class IndexedPriorityQueue:
+    """
+      A binary heap that also knows where each of its items is, so it can
+      test if an item is queued and lower the priority of a queued item
+      (decrease_key) without pushing it a second time. Every item is in the
+      queue at most once and must be hashable.
+
+      Items with equal priorities are popped in the order they were first
+      pushed: each entry carries a monotonic counter, so the items themselves
+      are never compared.
+    """
+
+    def __init__(self):
+        self.heap = []  # [priority, count, item] entries
+        self.index = {}  # item -> position of its entry in heap
+        self.count = 0
+
+    def push(self, item, priority):
+        "Queue 'item', or lower its priority to 'priority' if it is already queued"
+        if item in self.index:
+            self.decrease_key(item, priority)
+            return
+        self.heap.append([priority, self.count, item])
+        self.index[item] = len(self.heap) - 1
+        self.count += 1
+        self._sift_up(len(self.heap) - 1)
+
+    def pop(self):
+        "Remove and return the item with the lowest priority"
+        return self.pop_with_priority()[0]
+
+    def pop_with_priority(self):
+        "Remove and return (item, priority) of the item with the lowest priority"
+        last = self.heap.pop()
+        if self.heap:
+            top = self.heap[0]
+            self.heap[0] = last
+            self.index[last[2]] = 0
+            self._sift_down(0)
+        else:
+            top = last
+        del self.index[top[2]]
+        return top[2], top[0]
+
+    def decrease_key(self, item, priority):
+        "Lower the priority of the queued 'item'; higher priorities are ignored"
+        position = self.index[item]
+        if priority < self.heap[position][0]:
+            self.heap[position][0] = priority
+            self._sift_up(position)
+
+    def remove(self, item):
+        "Remove the queued 'item', whatever its priority"
+        position = self.index.pop(item)
+        last = self.heap.pop()
+        if position < len(self.heap):
+            self.heap[position] = last
+            self.index[last[2]] = position
+            self._sift_up(position)
+            self._sift_down(self.index[last[2]])
+
+    def peek(self):
+        "Return the item with the lowest priority without removing it"
+        return self.heap[0][2]
+
+    def contains(self, item):
+        return item in self.index
+
+    def get_priority(self, item):
+        return self.heap[self.index[item]][0]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _sift_up(self, position):
+        heap = self.heap
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if heap[parent][:2] <= entry[:2]:
+                break
+            heap[position] = heap[parent]
+            self.index[heap[position][2]] = position
+            position = parent
+        heap[position] = entry
+        self.index[entry[2]] = position
+
+    def _sift_down(self, position):
+        heap = self.heap
+        entry = heap[position]
+        size = len(heap)
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][:2] < heap[child][:2]:
+                child += 1
+            if entry[:2] <= heap[child][:2]:
+                break
+            heap[position] = heap[child]
+            self.index[heap[position][2]] = position
+            position = child
+        heap[position] = entry
+        self.index[entry[2]] = position
+
 
 class PriorityQueueWithFunction(PriorityQueue):
     """
@@ -108,6 +223,37 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class LRUCache:
+    """
+    A mapping that holds at most maxsize items: storing a new item when it is
+    full evicts the least recently used one.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+
+    def get(self, key, default=None):
+        "Returns the item stored for 'key' (marking it as used), or default"
+        if key not in self.items:
+            return default
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key, value):
+        "Stores 'value' for 'key', evicting the least recently used item if full"
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
 def manhattanDistance(xy1, xy2):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs(xy1[0] - xy2[0]) + abs(xy1[1] - xy2[1])
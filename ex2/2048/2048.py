@@ -4,6 +4,7 @@ import os
 import util
 from game import Game, RandomOpponentAgent
 from game_state import GameState
+from bitboard_game_state import BitboardGameState
 from graphics_display import GabrieleCirulli2048GraphicsDisplay
 from keyboard_agent import KeyboardAgent
 
@@ -12,8 +13,9 @@ NUM_OF_INITIAL_TILES = 2
 
 class GameRunner(object):
     def __init__(self, display=None, agent=None, num_of_initial_tiles=NUM_OF_INITIAL_TILES,
-                 sleep_between_actions=False):
+                 sleep_between_actions=False, game_state_class=GameState):
         super(GameRunner, self).__init__()
+        self.game_state_class = game_state_class
         self.sleep_between_actions = sleep_between_actions
         self.num_of_initial_tiles = num_of_initial_tiles
         self.human_agent = agent is None
@@ -30,7 +32,7 @@ class GameRunner(object):
     def new_game(self, initial_state=None, *args, **kw):
         self.quit_game()
         if initial_state is None:
-            initial_state = GameState()
+            initial_state = self.game_state_class()
         opponent_agent = RandomOpponentAgent()
         game = Game(self._agent, opponent_agent, self.display, sleep_between_actions=self.sleep_between_actions)
         for i in range(self.num_of_initial_tiles):
@@ -58,6 +60,7 @@ def main():
     parser.add_argument('--random_seed', help='The seed for the random state.', default=numpy.random.randint(100), type=int)
     displays = ['GUI', 'SummaryDisplay']
     agents = ['KeyboardAgent', 'ReflexAgent', 'MinmaxAgent', 'AlphaBetaAgent', 'ExpectimaxAgent']
+    game_states = {'GameState': GameState, 'BitboardGameState': BitboardGameState}
     parser.add_argument('--display', choices=displays, help='The game ui.', default=displays[0], type=str)
     parser.add_argument('--agent', choices=agents, help='The agent.', default=agents[0], type=str)
     parser.add_argument('--depth', help='The maximum depth for to search in the game tree.', default=2, type=int)
@@ -66,6 +69,9 @@ def main():
     parser.add_argument('--num_of_initial_tiles', help='The number non empty tiles when the game started.', default=2,
                         type=int)
     parser.add_argument('--initial_board', help='Initial board for new games.', default=None, type=str)
+    parser.add_argument('--game_state', choices=list(game_states),
+                        help='The state backend: BitboardGameState packs the 4x4 board into an integer.',
+                        default='GameState', type=str)
     parser.add_argument('--evaluation_function', help='The evaluation function for ai agent.',
                         default='score_evaluation_function', type=str)
     args = parser.parse_args()
@@ -83,9 +89,10 @@ def main():
         with open(os.path.join('layouts', args.initial_board), 'r') as f:
             lines = f.readlines()
             initial_board = numpy.array([list(map(lambda x: int(x), line.split(','))) for line in lines])
-            initial_state = GameState(board=initial_board)
+            initial_state = game_states[args.game_state](board=initial_board)
     game_runner = GameRunner(display=display, agent=agent, num_of_initial_tiles=args.num_of_initial_tiles,
-                             sleep_between_actions=args.sleep_between_actions)
+                             sleep_between_actions=args.sleep_between_actions,
+                             game_state_class=game_states[args.game_state])
     for i in range(args.num_of_games):
         score = game_runner.new_game(initial_state=initial_state)
     if display is not None:
@@ -0,0 +1,241 @@
+"""
+A GameState for the 4x4 board packed into one 64-bit integer.
+
+Each cell holds the exponent of its tile in 4 bits (0 for an empty cell, 1
+for 2, 2 for 4 and so on), cell (row, column) at bits 16 * row + 4 * column.
+A row is then a 16-bit integer, and moving it left or right, the score of
+the move and whether it moves at all are looked up in tables of all 65536
+rows, worked out once on import. Up and down move the rows of the
+transposed board.
+
+BitboardGameState has the interface of game_state.GameState, and plays:
+
+    python 2048.py --agent ExpectimaxAgent --game_state BitboardGameState
+"""
+
+import numpy as np
+
+from game import Action, OpponentAction
+
+BOARD_SIZE = 4
+ROW_MASK = 0xFFFF
+CELL_MASK = 0xF
+# The largest tile a cell holds is 2 ** MAX_EXPONENT (32768): two of them do not merge
+MAX_EXPONENT = 15
+
+
+def _reverse_row(row):
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+def _move_row_left(row):
+    """
+    Returns the row moved left (towards column 0) and the score of the move:
+    the sum of the tiles the merges make.
+    """
+    exponents = [(row >> (4 * column)) & CELL_MASK for column in range(BOARD_SIZE)]
+    tiles = [exponent for exponent in exponents if exponent]
+    moved = []
+    score = 0
+    column = 0
+    while column < len(tiles):
+        if column + 1 < len(tiles) and tiles[column] == tiles[column + 1] and tiles[column] < MAX_EXPONENT:
+            moved.append(tiles[column] + 1)
+            score += 1 << (tiles[column] + 1)
+            column += 2
+        else:
+            moved.append(tiles[column])
+            column += 1
+    return sum(exponent << (4 * column) for column, exponent in enumerate(moved)), score
+
+
+def _build_row_tables():
+    left, right, score = [0] * (ROW_MASK + 1), [0] * (ROW_MASK + 1), [0] * (ROW_MASK + 1)
+    for row in range(ROW_MASK + 1):
+        moved, row_score = _move_row_left(row)
+        left[row] = moved
+        score[row] = row_score
+        # Moving right is moving the reversed row left
+        right[_reverse_row(row)] = _reverse_row(moved)
+    return left, right, score
+
+
+ROW_LEFT, ROW_RIGHT, ROW_SCORE = _build_row_tables()
+# The score of moving a row right is that of moving the reversed row left
+ROW_SCORE_RIGHT = [ROW_SCORE[_reverse_row(row)] for row in range(ROW_MASK + 1)]
+# Whether a row changes when moved left or right
+ROW_LEFT_LEGAL = [ROW_LEFT[row] != row for row in range(ROW_MASK + 1)]
+ROW_RIGHT_LEGAL = [ROW_RIGHT[row] != row for row in range(ROW_MASK + 1)]
+
+
+def transpose(board):
+    """
+    Returns the board with its rows as columns, by swapping the 4-bit cells
+    across the diagonal of each 2x2 block, then the 2x2 blocks across the
+    diagonal of the board.
+    """
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    board = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = board & 0xFF00FF0000FF00FF
+    b2 = board & 0x00FF00FF00000000
+    b3 = board & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _rows(board):
+    return board & ROW_MASK, (board >> 16) & ROW_MASK, (board >> 32) & ROW_MASK, board >> 48
+
+
+def _move_rows(rows, row_table, score_table):
+    row0, row1, row2, row3 = rows
+    moved = row_table[row0] | (row_table[row1] << 16) | (row_table[row2] << 32) | (row_table[row3] << 48)
+    return moved, score_table[row0] + score_table[row1] + score_table[row2] + score_table[row3]
+
+
+def board_moves(board):
+    """
+    Returns the (action, board after it, score of the move) of the actions
+    that change the board, in the order RIGHT, LEFT, UP, DOWN.
+    """
+    moves = []
+    rows = _rows(board)
+    row0, row1, row2, row3 = rows
+    if ROW_RIGHT_LEGAL[row0] or ROW_RIGHT_LEGAL[row1] or ROW_RIGHT_LEGAL[row2] or ROW_RIGHT_LEGAL[row3]:
+        moves.append((Action.RIGHT,) + _move_rows(rows, ROW_RIGHT, ROW_SCORE_RIGHT))
+    if ROW_LEFT_LEGAL[row0] or ROW_LEFT_LEGAL[row1] or ROW_LEFT_LEGAL[row2] or ROW_LEFT_LEGAL[row3]:
+        moves.append((Action.LEFT,) + _move_rows(rows, ROW_LEFT, ROW_SCORE))
+    # The columns of the board are the rows of its transpose
+    columns = _rows(transpose(board))
+    column0, column1, column2, column3 = columns
+    if ROW_LEFT_LEGAL[column0] or ROW_LEFT_LEGAL[column1] or ROW_LEFT_LEGAL[column2] or ROW_LEFT_LEGAL[column3]:
+        moved, score = _move_rows(columns, ROW_LEFT, ROW_SCORE)
+        moves.append((Action.UP, transpose(moved), score))
+    if ROW_RIGHT_LEGAL[column0] or ROW_RIGHT_LEGAL[column1] or ROW_RIGHT_LEGAL[column2] or ROW_RIGHT_LEGAL[column3]:
+        moved, score = _move_rows(columns, ROW_RIGHT, ROW_SCORE_RIGHT)
+        moves.append((Action.DOWN, transpose(moved), score))
+    return moves
+
+
+def pack_board(board):
+    """
+    Returns the packed integer of a 4x4 array of tiles (powers of two or 0).
+    """
+    packed = 0
+    for row in range(BOARD_SIZE):
+        for column in range(BOARD_SIZE):
+            tile = int(board[row][column])
+            if tile:
+                packed |= (tile.bit_length() - 1) << (16 * row + 4 * column)
+    return packed
+
+
+def unpack_board(packed):
+    """
+    Returns the 4x4 int32 array of the tiles of a packed board.
+    """
+    exponents = np.array([(packed >> (4 * cell)) & CELL_MASK for cell in range(BOARD_SIZE * BOARD_SIZE)],
+                         dtype=np.int32).reshape(BOARD_SIZE, BOARD_SIZE)
+    return np.where(exponents > 0, np.left_shift(1, exponents), 0).astype(np.int32)
+
+
+class BitboardGameState(object):
+    def __init__(self, rows=BOARD_SIZE, columns=BOARD_SIZE, board=None, score=0, done=False, packed=None):
+        super(BitboardGameState, self).__init__()
+        if rows != BOARD_SIZE or columns != BOARD_SIZE:
+            raise Exception("BitboardGameState only holds %dx%d boards." % (BOARD_SIZE, BOARD_SIZE))
+        # None until asked for after an opponent action
+        self._done = done
+        self._score = score
+        if packed is None:
+            packed = 0 if board is None else pack_board(board)
+        self._packed = packed
+        # The boards the agent's legal actions lead to, and their scores
+        self._moves = None
+
+    @property
+    def done(self):
+        if self._done is None:
+            self._done = not self._get_moves()
+        return self._done
+
+    @property
+    def score(self):
+        return self._score
+
+    @property
+    def max_tile(self):
+        packed = self._packed
+        exponent = max((packed >> (4 * cell)) & CELL_MASK for cell in range(BOARD_SIZE * BOARD_SIZE))
+        return 1 << exponent if exponent else 0
+
+    @property
+    def board(self):
+        return unpack_board(self._packed)
+
+    @property
+    def packed(self):
+        return self._packed
+
+    def get_legal_actions(self, agent_index):
+        if agent_index == 0:
+            return self.get_agent_legal_actions()
+        elif agent_index == 1:
+            return self.get_opponent_legal_actions()
+        else:
+            raise Exception("illegal agent index.")
+
+    def _empty_cells(self):
+        packed = self._packed
+        return [cell for cell in range(BOARD_SIZE * BOARD_SIZE) if not (packed >> (4 * cell)) & CELL_MASK]
+
+    def get_opponent_legal_actions(self):
+        return [OpponentAction(row=cell >> 2, column=cell & 3, value=value)
+                for cell in self._empty_cells() for value in [2, 4]]
+
+    def _get_moves(self):
+        if self._moves is None:
+            self._moves = {action: (moved, score) for action, moved, score in board_moves(self._packed)}
+        return self._moves
+
+    def get_agent_legal_actions(self):
+        return list(self._get_moves())
+
+    def get_empty_tiles(self):
+        cells = np.array(self._empty_cells(), dtype=np.int64)
+        return cells >> 2, cells & 3
+
+    def apply_opponent_action(self, action):
+        shift = 16 * int(action.row) + 4 * int(action.column)
+        if (self._packed >> shift) & CELL_MASK:
+            raise Exception("illegal opponent action (%s,%s) isn't empty." % (action.row, action.column))
+        if action.value <= 0:
+            raise Exception("The action value must be positive integer.")
+        self._packed |= (int(action.value).bit_length() - 1) << shift
+        self._moves = None
+        # Whether the agent can still move is only worked out if asked
+        if not self._done:
+            self._done = None
+
+    def apply_action(self, action):
+        move = self._get_moves().get(action)
+        if move is None:
+            raise Exception("illegal action.")
+        self._packed = move[0]
+        self._score += move[1]
+        self._moves = None
+
+    def generate_successor(self, agent_index=0, action=Action.STOP):
+        successor = BitboardGameState(score=self._score, done=self._done, packed=self._packed)
+        if agent_index == 0:
+            move = self._get_moves().get(action)
+            if move is None:
+                raise Exception("illegal action.")
+            successor._packed = move[0]
+            successor._score += move[1]
+        elif agent_index == 1:
+            successor.apply_opponent_action(action)
+        else:
+            raise Exception("illegal agent index.")
+        return successor